@@ -0,0 +1,59 @@
+"""
+    Measures the latency of Board.remove_connections for boards with a
+    growing number of connections.
+
+    The board consists of many small nets (chains of a few pins), which is
+    what a real PCB looks like. Removing a wire should only touch the net it
+    belongs to, so the latency should stay flat while the total number of
+    connections grows.
+
+    Usage: python benchmarks/remove_connections.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from lockgame.board import Board, Pin
+
+NET_SIZE = 4
+REMOVALS = 200
+
+
+def create_board(num_connections):
+    num_nets = num_connections // (NET_SIZE - 1)
+
+    pins = [Pin(i % 1000, i // 1000, 'N{}'.format(i))
+        for i in range(num_nets * NET_SIZE)]
+
+    board = Board()
+    pins = board.add_pins(pins)
+
+    for net in range(num_nets):
+        net_pins = pins[net * NET_SIZE:(net + 1) * NET_SIZE]
+        for pin1, pin2 in zip(net_pins, net_pins[1:]):
+            board.add_connection(pin1, pin2)
+
+    return board, pins
+
+
+def main():
+    print("{:>12} {:>16}".format("connections", "remove (us/op)"))
+
+    for num_connections in (1000, 5000, 10000, 25000, 50000):
+        board, pins = create_board(num_connections)
+        victims = random.sample(pins, REMOVALS)
+
+        it = iter(victims)
+        elapsed = timeit.timeit(
+            lambda: board.remove_connections(next(it)), number=REMOVALS)
+
+        print("{:>12} {:>16.1f}".format(
+            num_connections, elapsed / REMOVALS * 1e6))
+
+
+if __name__ == '__main__':
+    main()
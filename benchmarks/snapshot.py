@@ -0,0 +1,60 @@
+"""
+    Compares restoring a board from a snapshot with replaying all of its
+    connections, for boards with a growing number of connections.
+
+    Usage: python benchmarks/snapshot.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from lockgame.board import Board, Pin
+
+
+def create_pins(num_connections):
+    return [Pin(random.uniform(0, 1000), random.uniform(0, 1000),
+        'N{}'.format(i // 2)) for i in range(num_connections * 2)]
+
+
+def main():
+    print("{:>12} {:>12} {:>12} {:>12}".format(
+        "connections", "save (ms)", "replay (ms)", "restore (ms)"))
+
+    path = os.path.join(tempfile.mkdtemp(), 'board.snapshot')
+
+    for num_connections in (1000, 10000, 50000):
+        pins = create_pins(num_connections)
+
+        board = Board()
+        board_pins = board.add_pins(pins)
+        wires = [(random.choice(board_pins), random.choice(board_pins))
+            for i in range(num_connections)]
+
+        start = time.perf_counter()
+        with board.batch():
+            for pin1, pin2 in wires:
+                board.add_connection(pin1, pin2)
+        replay = time.perf_counter() - start
+
+        start = time.perf_counter()
+        board.save_snapshot(path)
+        save = time.perf_counter() - start
+
+        restored = Board()
+        restored.add_pins(pins)
+
+        start = time.perf_counter()
+        restored.restore_snapshot(path)
+        restore = time.perf_counter() - start
+
+        print("{:>12} {:>12.1f} {:>12.1f} {:>12.1f}".format(
+            num_connections, save * 1e3, replay * 1e3, restore * 1e3))
+
+
+if __name__ == '__main__':
+    main()
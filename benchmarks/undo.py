@@ -0,0 +1,67 @@
+"""
+    Compares removing the wires of a pin in a single large net, which
+    rebuilds the union find state of that net, with undoing and redoing the
+    removal from the journal, which rolls back the logged union find writes.
+
+    Usage: python benchmarks/undo.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from lockgame.board import Board, Journal, Pin
+
+REPEATS = 20
+
+
+def create_board(num_pins):
+    pins = [Pin(i % 1000, i // 1000, 'N{}'.format(i)) for i in range(num_pins)]
+
+    board = Board()
+    pins = board.add_pins(pins)
+
+    # One large net, like a ground plane, with random wires inside it
+    for i in range(1, num_pins):
+        board.add_connection(pins[random.randrange(i)], pins[i])
+
+    return board, pins
+
+
+def main():
+    print("{:>12} {:>12} {:>12} {:>12}".format(
+        "net size", "remove (ms)", "undo (ms)", "redo (ms)"))
+
+    for num_pins in (1000, 10000, 50000):
+        board, pins = create_board(num_pins)
+        journal = Journal(board)
+
+        remove = undo = redo = 0
+
+        for i in range(REPEATS):
+            pin = random.choice(pins)
+
+            start = time.perf_counter()
+            board.remove_connections(pin)
+            remove += time.perf_counter() - start
+
+            start = time.perf_counter()
+            journal.undo()
+            undo += time.perf_counter() - start
+
+            start = time.perf_counter()
+            journal.redo()
+            redo += time.perf_counter() - start
+
+            journal.undo()
+
+        print("{:>12} {:>12.2f} {:>12.2f} {:>12.2f}".format(num_pins,
+            remove / REPEATS * 1e3, undo / REPEATS * 1e3,
+            redo / REPEATS * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+    Microbenchmarks for lockgame.vector on the wire drawing workload.
+
+    Computes the bezier control points of the wires the way
+    PCBWidget.draw_wire used to, with the previous Vec2d implementation
+    (LegacyVec2d below), the current Vec2d and FrozenVec2d, and in one batch
+    with Vec2dArray and lockgame.wiregeometry.
+
+    Usage: python benchmarks/vector.py
+"""
+
+import math
+import operator
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from lockgame.vector import Vec2d, FrozenVec2d, Vec2dArray
+from lockgame.wiregeometry import wire_geometry
+
+NUM_WIRES = 1000
+REPEAT = 5
+
+
+class LegacyVec2d:
+    """
+        The operators of Vec2d before the fast paths were added, trimmed
+        down to what the drawing workload uses.
+    """
+
+    __slots__ = ['x', 'y']
+
+    def __init__(self, x_or_pair, y=None):
+        if not y:
+            self.x = x_or_pair[0]
+            self.y = x_or_pair[1]
+        else:
+            self.x = x_or_pair
+            self.y = y
+
+    def _o2(self, other, f):
+        if isinstance(other, LegacyVec2d):
+            return LegacyVec2d(f(self.x, other.x), f(self.y, other.y))
+        elif (hasattr(other, "__getitem__")):
+            return LegacyVec2d(f(self.x, other[0]), f(self.y, other[1]))
+        else:
+            return LegacyVec2d(f(self.x, other), f(self.y, other))
+
+    def __add__(self, other):
+        if isinstance(other, LegacyVec2d):
+            return LegacyVec2d(self.x + other.x, self.y + other.y)
+        elif hasattr(other, "__getitem__"):
+            return LegacyVec2d(self.x + other[0], self.y + other[1])
+        else:
+            return LegacyVec2d(self.x + other, self.y + other)
+
+    def __sub__(self, other):
+        if isinstance(other, LegacyVec2d):
+            return LegacyVec2d(self.x - other.x, self.y - other.y)
+        elif (hasattr(other, "__getitem__")):
+            return LegacyVec2d(self.x - other[0], self.y - other[1])
+        else:
+            return LegacyVec2d(self.x - other, self.y - other)
+
+    def __mul__(self, other):
+        if isinstance(other, LegacyVec2d):
+            return LegacyVec2d(self.x*other.x, self.y*other.y)
+        if (hasattr(other, "__getitem__")):
+            return LegacyVec2d(self.x*other[0], self.y*other[1])
+        else:
+            return LegacyVec2d(self.x*other, self.y*other)
+
+    def __truediv__(self, other):
+        return self._o2(other, operator.truediv)
+
+    def __neg__(self):
+        return LegacyVec2d(operator.neg(self.x), operator.neg(self.y))
+
+    @property
+    def length(self):
+        return math.sqrt(self.x**2 + self.y**2)
+
+    def normalized(self):
+        length = self.length
+        if length != 0:
+            return self/length
+        return LegacyVec2d(self)
+
+    def perpendicular(self):
+        return LegacyVec2d(-self.y, self.x)
+
+
+def control_points(cls, wires):
+    """
+        The control point computation from PCBWidget.draw_wire, for the
+        given vector class.
+    """
+
+    for x1, y1, x2, y2 in wires:
+        v1 = cls(x1, y1)
+        v2 = cls(x2, y2)
+
+        v = (v2 - v1)
+        v_norm = v.normalized()
+
+        contr1_start = v1 + (v_norm * (v.length / 4))
+        contr1_perp = contr1_start.perpendicular().normalized()
+        contr1_start + (contr1_perp * (v.length / 4))
+
+        contr2_start = v2 - (v_norm * ((v.length) / 4))
+        contr2_perp = -contr2_start.perpendicular().normalized()
+        contr2_start + (contr2_perp * (v.length / 4))
+
+
+def control_points_array(x1, y1, x2, y2):
+    v1 = Vec2dArray(x1, y1)
+    v2 = Vec2dArray(x2, y2)
+
+    v = v2 - v1
+    v_norm = v.normalized()
+    quarter = v.length / 4
+
+    contr1_start = v1 + v_norm * quarter
+    contr1_start + contr1_start.perpendicular().normalized() * quarter
+
+    contr2_start = v2 - v_norm * quarter
+    contr2_start - contr2_start.perpendicular().normalized() * quarter
+
+
+def report(name, function):
+    elapsed = min(timeit.repeat(function, number=1, repeat=REPEAT))
+    print("{:<28} {:>10.2f}".format(name, elapsed / NUM_WIRES * 1e6))
+
+
+def main():
+    # Random window coordinates, slightly off the integer grid so the
+    # legacy constructor doesn't trip over zero coordinates
+    wires = [tuple(random.uniform(1, 1000) for _ in range(4))
+        for _ in range(NUM_WIRES)]
+    x1, y1, x2, y2 = (list(column) for column in zip(*wires))
+
+    print("{:<28} {:>10}".format("implementation", "us/wire"))
+
+    report("LegacyVec2d", lambda: control_points(LegacyVec2d, wires))
+    report("Vec2d", lambda: control_points(Vec2d, wires))
+    report("FrozenVec2d", lambda: control_points(FrozenVec2d, wires))
+    report("Vec2dArray", lambda: control_points_array(x1, y1, x2, y2))
+    report("wiregeometry.wire_geometry",
+        lambda: wire_geometry(x1, y1, x2, y2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+"""
+    The connectivity core of the game: pins, connections and the union find
+    structure tracking which nodes are connected.
+
+    Nothing in this package depends on GTK or librsvg, so boards can be
+    simulated and benchmarked without a display.
+"""
+
+from lockgame.board.board import Board, BoardChange
+from lockgame.board.pintable import Pin, PinTable
+from lockgame.board.pinlayout import PinLayout, load_pin_layout
+from lockgame.board.connections import Connection, ConnectionStore
+from lockgame.board.pinindex import PinIndex, KDTreePinIndex, GridPinIndex
+from lockgame.board.unionfind import UnionFind, RollbackUnionFind
+from lockgame.board.rules import RuleSet, compile_rule
+from lockgame.board.snapshot import Snapshot, save_snapshot
+from lockgame.board.journal import Journal
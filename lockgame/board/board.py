@@ -0,0 +1,396 @@
+from contextlib import contextmanager
+
+from lockgame.board.unionfind import RollbackUnionFind
+from lockgame.board.connections import ConnectionStore
+from lockgame.board.pinindex import GridPinIndex
+from lockgame.board.pintable import PinTable, Pin
+from lockgame.board.pinlayout import PinLayout
+from lockgame.board.snapshot import Snapshot, save_snapshot
+
+# Cell size of the default spatial index, in SVG coordinates
+DEFAULT_CELL_SIZE = 7.5
+
+
+class BoardChange:
+    """
+        The difference made by an edit, or a batch of edits, of the
+        connections on a board.
+
+        ``added`` and ``removed`` map connection ids to connections, a
+        connection which is added and removed again within a batch is in
+        neither. ``roots`` are the union find roots of the changed
+        components, as they were before each edit.
+
+        ``writes`` is the log of the union find writes made by the change,
+        which Board.revert uses to undo it. Changes which can't be undone,
+        like restoring a snapshot, are not ``reversible``.
+    """
+
+    def __init__(self):
+        self.added = {}
+        self.removed = {}
+        self.roots = set()
+        self.writes = []
+        self.reversible = True
+
+    def __bool__(self):
+        # A wire added and removed again within a batch can still leave the
+        # union find with different roots
+        return bool(self.added or self.removed or self.roots)
+
+    def add(self, connection):
+        # Reverting a removal puts back the same connection
+        if self.removed.pop(connection.id, None) is None:
+            self.added[connection.id] = connection
+
+    def remove(self, connection):
+        if self.added.pop(connection.id, None) is None:
+            self.removed[connection.id] = connection
+
+
+class Board:
+    """
+        The pins of a PCB and the connections between them, without any
+        user interface.
+
+        Keeps track of which nodes are connected with a RollbackUnionFind,
+        so edits can be undone at the cost of O(log n) finds. Listeners
+        registered with add_listener are called after every change of the
+        connections as ``listener(board, change)``, with a BoardChange
+        describing it. Edits made within ``with board.batch():`` result in
+        a single call after the batch.
+
+        When height is given, pins passed to add_pins are in inkscape
+        coordinates and are flipped against it.
+    """
+
+    def __init__(self, height=None, pin_index=None):
+        self.height = height
+
+        # Spatial index used for hit testing, any PinIndex implementation
+        # can be plugged in here
+        if pin_index is None:
+            pin_index = GridPinIndex(DEFAULT_CELL_SIZE)
+
+        self.pins = pin_index
+        self.pin_table = PinTable()
+        self.connections = ConnectionStore()
+        self.quick_union = RollbackUnionFind()
+
+        self.listeners = []
+
+        # Change collecting the edits of the current batch
+        self.batch_depth = 0
+        self.pending = None
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def notify(self, change):
+        for listener in list(self.listeners):
+            listener(self, change)
+
+    @contextmanager
+    def batch(self):
+        """
+            Context manager which collects all edits made within it in a
+            single change, listeners are notified once at the end. Batches
+            can be nested, only the outermost batch notifies.
+        """
+
+        if self.batch_depth == 0:
+            self.pending = BoardChange()
+            self.quick_union.log = self.pending.writes
+
+        self.batch_depth += 1
+
+        try:
+            yield self.pending
+        finally:
+            self.batch_depth -= 1
+
+            if self.batch_depth == 0:
+                change, self.pending = self.pending, None
+                self.quick_union.log = None
+
+                if change:
+                    self.notify(change)
+
+    def begin_change(self):
+        if self.pending is not None:
+            return self.pending
+
+        change = BoardChange()
+        self.quick_union.log = change.writes
+
+        return change
+
+    def end_change(self, change):
+        if self.pending is None:
+            self.quick_union.log = None
+            self.notify(change)
+
+    def root(self, node):
+        uf = self.quick_union
+
+        return uf.find_id(uf.ids[node])
+
+    def add_pins(self, pins):
+        if isinstance(pins, Pin):
+            pins = [pins]
+
+        # Layouts imported from the SVG are in SVG coordinates already, other
+        # pins are flipped by the pin table while loading. From here on we
+        # work with the pins created by the table.
+        if isinstance(pins, PinLayout):
+            pins = self.pin_table.load_layout(pins)
+        else:
+            pins = self.pin_table.load(pins, self.height)
+
+        # Build the spatial index in one go for the initial (or any large)
+        # batch of pins, a few extra pins are just inserted
+        if len(self.pins) and len(pins) < len(self.pins):
+            for pin in pins:
+                self.pins.add(pin)
+        else:
+            self.pins.bulk_load(pins)
+
+        # Register new nodes, existing connections are kept as they are
+        for pin in pins:
+            self.quick_union.add(pin.node)
+
+        return pins
+
+    def add_connection(self, pin1, pin2):
+        change = self.begin_change()
+        connection = self.connections.add(pin1, pin2)
+
+        change.add(connection)
+        change.roots.add(self.root(pin1.node))
+        change.roots.add(self.root(pin2.node))
+
+        self.quick_union.union(pin1.node, pin2.node)
+        self.end_change(change)
+
+        return connection
+
+    def component_nodes(self, node):
+        """
+            Collect all nodes which are reachable from the given node by
+            following connections.
+        """
+
+        return set(self.quick_union.members(node))
+
+    def net_id(self, node):
+        """
+            Returns an integer identifying the net of a node. Nodes in the
+            same net have the same id, until the next change of the board.
+        """
+
+        return self.quick_union.net_id(node)
+
+    def net_members(self, node):
+        """
+            Returns the names of all nodes in the net of a node, including
+            the node itself.
+        """
+
+        return self.quick_union.members(node)
+
+    def net_size(self, node):
+        """
+            Returns the number of nodes in the net of a node.
+        """
+
+        return self.quick_union.size(node)
+
+    def net_pins(self, node):
+        """
+            Returns all pins in the net of a node.
+        """
+
+        node_pins = self.pin_table.node_pins
+
+        return [pin for member in self.quick_union.members(node)
+            for pin in node_pins.get(member, ())]
+
+    def remove_connections(self, pin):
+        if not self.connections.touching(pin):
+            return []
+
+        # Only the component containing this pin can be affected, so we
+        # rebuild the union find structure for that component alone.
+        change = self.begin_change()
+        change.roots.add(self.root(pin.node))
+
+        component = self.quick_union.members(pin.node)
+        removed = self.connections.remove_pin(pin)
+        for connection in removed:
+            change.remove(connection)
+
+        self.quick_union.reset(component)
+
+        for node in component:
+            for connection in self.connections.touching_node(node):
+                self.quick_union.union(connection.pin1.node,
+                    connection.pin2.node)
+
+        self.end_change(change)
+
+        return removed
+
+    def save_snapshot(self, path):
+        """
+            Save the pins, connections and union find state to a snapshot
+            file.
+        """
+
+        save_snapshot(self, path)
+
+    def restore_snapshot(self, path):
+        """
+            Replace the pins and connections of the board by those in a
+            snapshot file. Returns the new pins.
+        """
+
+        return self.restore(Snapshot.open(path))
+
+    def restore(self, snapshot):
+        """
+            Replace the pins and connections of the board by those in a
+            Snapshot. The union find state is taken from the snapshot as
+            well, instead of replaying the connections.
+        """
+
+        change = self.begin_change()
+        change.reversible = False
+
+        # Every component can change
+        uf = self.quick_union
+        change.roots.update(i for i, parent in enumerate(uf.parents)
+            if i == parent)
+
+        for connection in self.connections:
+            change.remove(connection)
+
+        self.connections.clear()
+
+        # Snapshots are usually restored on the board they were taken from,
+        # the pins are only loaded again when they differ. Snapshot pins are
+        # in SVG coordinates, like a pin layout.
+        if self.pin_table.matches(snapshot):
+            pins = self.pin_table.pins
+        else:
+            self.pin_table = PinTable()
+            pins = self.pin_table.load_layout(snapshot)
+
+            self.pins.clear()
+            self.pins.bulk_load(pins)
+
+        uf.restore(snapshot.names, snapshot.parents, snapshot.sizes)
+
+        ends = snapshot.ends
+        for connection in self.connections.load(
+                (pins[i], pins[j]) for i, j in zip(ends[::2], ends[1::2])):
+            change.add(connection)
+
+        self.end_change(change)
+
+        return pins
+
+    def revert(self, change):
+        """
+            Undo a reversible change: put back the connections it removed,
+            remove the ones it added and roll back its union find writes,
+            without rebuilding any component.
+
+            Listeners are notified of the undoing change, which is returned
+            as well. Reverting that change redoes the original one. This
+            only works when the board was not edited since the change, or
+            all later changes were reverted already. Edits of a batch which
+            is still open are not a change yet, so reverting is refused
+            within a batch.
+        """
+
+        if not change.reversible:
+            raise ValueError("Change can not be reverted")
+
+        if self.pending is not None:
+            raise ValueError("Can not revert a change within a batch")
+
+        inverse = self.begin_change()
+        uf = self.quick_union
+
+        # A component changes only if a parent on the path of one of its
+        # nodes is written, or the size of its root. Resets cover complete
+        # components, any part of them which was joined with another
+        # component since has a single write as well.
+        parents = uf.parents
+        for column, i, value, new_value in change.writes:
+            if column is uf.links:
+                continue
+
+            if type(i) is not list:
+                inverse.roots.add(uf.find_id(i))
+            elif column is parents:
+                inverse.roots.update(j for j in i if parents[j] == j)
+        uf.revert(change.writes)
+
+        for connection in change.added.values():
+            inverse.remove(self.connections.remove(connection.id))
+
+        for connection in change.removed.values():
+            inverse.add(self.connections.insert(connection))
+
+        self.end_change(inverse)
+
+        return inverse
+
+    def pins_connected(self, pin1, pin2):
+        return self.quick_union.connected(pin1.node, pin2.node)
+
+    def nodes_connected(self, node1, node2):
+        return self.quick_union.connected(node1, node2)
+
+    def nearest_pin(self, point):
+        result = self.pins.nearest(point)
+
+        if result:
+            return result[0]
+
+        return None
+
+    def pin_within(self, point, radius):
+        """
+            Returns a ``(pin, squared distance)`` tuple for the pin nearest to
+            the given point if it lies within radius, otherwise None.
+        """
+
+        return self.pins.within(point, radius)
+
+    def nearest_pins(self, points):
+        """
+            Batch version of nearest_pin. Returns a list with the nearest pin
+            for each point, and an array with the squared distances.
+        """
+
+        indices, distances = self.pin_table.nearest(points)
+        pins = self.pin_table.pins
+
+        return [pins[i] if i >= 0 else None for i in indices], distances
+
+    def pins_within(self, points, radius):
+        """
+            Batch version of pin_within. Returns a list with for each point
+            the nearest pin within radius (or None), and an array with the
+            squared distances.
+        """
+
+        indices, distances = self.pin_table.nearest(points, radius)
+        pins = self.pin_table.pins
+
+        return [pins[i] if i >= 0 else None for i in indices], distances
@@ -0,0 +1,159 @@
+from collections import namedtuple
+from itertools import count
+
+Connection = namedtuple('Connection', ['pin1', 'pin2', 'id'])
+
+
+class ConnectionStore:
+    """
+        Stores the wires between pins.
+
+        Every connection gets a stable integer id. Next to the connections
+        themselves we keep an adjacency index per pin and per node name, so
+        looking up or removing the wires touching a pin only costs the degree
+        of that pin.
+
+        After a bulk load the adjacency indexes are only built once they are
+        needed.
+    """
+
+    def __init__(self):
+        self.connections = {}
+        self.pin_index = {}
+        self.node_index = {}
+        self.indexed = True
+
+        self.ids = count()
+
+    def __iter__(self):
+        return iter(self.connections.values())
+
+    def __len__(self):
+        return len(self.connections)
+
+    def __contains__(self, connection_id):
+        return connection_id in self.connections
+
+    def __getitem__(self, connection_id):
+        return self.connections[connection_id]
+
+    def add(self, pin1, pin2):
+        return self.insert(Connection(pin1, pin2, next(self.ids)))
+
+    def insert(self, connection):
+        """
+            Store an existing connection under its own id, for example one
+            which was removed before.
+        """
+
+        if not self.indexed:
+            self.build_index()
+
+        pin1, pin2 = connection.pin1, connection.pin2
+        self.connections[connection.id] = connection
+
+        # Pins do not define a hash, so the pin index is keyed by identity
+        for pin in {id(pin1): pin1, id(pin2): pin2}.values():
+            self.pin_index.setdefault(id(pin), {})[connection.id] = connection
+
+        for node in {pin1.node, pin2.node}:
+            self.node_index.setdefault(node, {})[connection.id] = connection
+
+        return connection
+
+    def load(self, pairs):
+        """
+            Add connections for many ``(pin1, pin2)`` pairs at once, and
+            return them.
+        """
+
+        ids = self.ids
+        loaded = [Connection(pin1, pin2, next(ids)) for pin1, pin2 in pairs]
+
+        self.connections.update(
+            (connection.id, connection) for connection in loaded)
+        self.indexed = False
+
+        return loaded
+
+    def build_index(self):
+        pin_index = self.pin_index
+        node_index = self.node_index
+
+        pin_index.clear()
+        node_index.clear()
+
+        for connection in self.connections.values():
+            connection_id = connection.id
+            pin1, pin2 = connection.pin1, connection.pin2
+
+            pin_index.setdefault(id(pin1), {})[connection_id] = connection
+            if pin2 is not pin1:
+                pin_index.setdefault(id(pin2), {})[connection_id] = connection
+
+            node_index.setdefault(pin1.node, {})[connection_id] = connection
+            if pin2.node != pin1.node:
+                node_index.setdefault(pin2.node, {})[connection_id] = (
+                    connection)
+
+        self.indexed = True
+
+    def remove(self, connection_id):
+        if not self.indexed:
+            self.build_index()
+
+        connection = self.connections.pop(connection_id)
+
+        for pin in (connection.pin1, connection.pin2):
+            adjacent = self.pin_index.get(id(pin))
+            if adjacent is not None:
+                adjacent.pop(connection_id, None)
+                if not adjacent:
+                    del self.pin_index[id(pin)]
+
+        for node in (connection.pin1.node, connection.pin2.node):
+            adjacent = self.node_index.get(node)
+            if adjacent is not None:
+                adjacent.pop(connection_id, None)
+                if not adjacent:
+                    del self.node_index[node]
+
+        return connection
+
+    def clear(self):
+        self.connections.clear()
+        self.pin_index.clear()
+        self.node_index.clear()
+        self.indexed = True
+
+    def remove_pin(self, pin):
+        """
+            Remove all connections touching the given pin, and return them.
+        """
+
+        if not self.indexed:
+            self.build_index()
+
+        return [self.remove(connection_id)
+            for connection_id in list(self.pin_index.get(id(pin), ()))]
+
+    def touching(self, pin):
+        """
+            Returns the connections which have the given pin on either end.
+        """
+
+        if not self.indexed:
+            self.build_index()
+
+        return self.pin_index.get(id(pin), {}).values()
+
+    def touching_node(self, node):
+        """
+            Returns the connections which have a pin with the given node name
+            on either end.
+        """
+
+        if not self.indexed:
+            self.build_index()
+
+        return self.node_index.get(node, {}).values()
@@ -0,0 +1,150 @@
+"""
+    Undo and redo of the wiring edits on a board.
+
+    The journal keeps the changes a board notifies its listeners of. Each
+    change carries the log of its union find writes, so undoing an edit
+    rolls back those writes instead of rebuilding the affected component.
+
+    Undoing an added wire only rolls back a few writes. Removing wires
+    resets and rebuilds their whole net, which logs every node of the net,
+    so undoing or redoing a removal is still linear in the size of the net.
+    It also makes the log of a removal as large as the net, which is why
+    the journal is limited by the number of logged values as well as by
+    the number of steps.
+"""
+
+from collections import deque
+
+# Number of edits which can be undone
+DEFAULT_DEPTH = 256
+
+# Number of union find values the steps of a journal may log together. A
+# logged value takes about 80 bytes, and removing the wires of a pin in a
+# net of 50000 nodes logs about 350000 values.
+DEFAULT_MAX_WRITES = 1 << 19
+
+
+def logged_writes(change):
+    """
+        Returns the number of union find values logged by a change.
+    """
+
+    return sum(len(i) if type(i) is list else 1
+        for column, i, value, new_value in change.writes)
+
+
+class Journal:
+    """
+        Records the changes of a board, and undoes or redoes them in order.
+
+        Every edit (or batch of edits) is one step. Making a new edit
+        drops the steps which were undone, and a change which can't be
+        reverted, like restoring a snapshot, clears the whole journal.
+
+        The oldest steps are dropped when there are more than depth steps,
+        or when the steps log more than max_writes values together. The
+        latest step is always kept.
+    """
+
+    def __init__(self, board, depth=DEFAULT_DEPTH,
+            max_writes=DEFAULT_MAX_WRITES):
+        self.board = board
+        self.depth = depth
+        self.max_writes = max_writes
+
+        # Both stacks hold (change, logged writes) tuples
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.writes = 0
+
+        # Set while the journal itself reverts a change
+        self.replaying = False
+
+        board.add_listener(self.on_board_change)
+
+    def on_board_change(self, board, change):
+        if self.replaying:
+            return
+
+        self.clear_redo()
+
+        if change.reversible:
+            self.push_undo(change)
+        else:
+            self.clear()
+
+    def push_undo(self, change):
+        writes = logged_writes(change)
+        self.undo_stack.append((change, writes))
+        self.writes += writes
+
+        while len(self.undo_stack) > 1 and (
+                len(self.undo_stack) > self.depth or
+                self.writes > self.max_writes):
+            dropped, writes = self.undo_stack.popleft()
+            self.writes -= writes
+
+    def clear_redo(self):
+        self.writes -= sum(writes for change, writes in self.redo_stack)
+        self.redo_stack.clear()
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        """
+            Undo the last edit. Returns the change made on the board, or
+            None when there is nothing to undo. Raises ValueError within a
+            batch of the board.
+        """
+
+        if not self.undo_stack:
+            return None
+
+        change, writes = self.undo_stack[-1]
+        inverse = self.replay(change)
+
+        self.undo_stack.pop()
+        self.writes -= writes
+
+        writes = logged_writes(inverse)
+        self.redo_stack.append((inverse, writes))
+        self.writes += writes
+
+        return inverse
+
+    def redo(self):
+        """
+            Redo the last undone edit. Returns the change made on the board,
+            or None when there is nothing to redo. Raises ValueError within
+            a batch of the board.
+        """
+
+        if not self.redo_stack:
+            return None
+
+        change, writes = self.redo_stack[-1]
+        inverse = self.replay(change)
+
+        self.redo_stack.pop()
+        self.writes -= writes
+
+        self.push_undo(inverse)
+
+        return inverse
+
+    def replay(self, change):
+        self.replaying = True
+
+        try:
+            return self.board.revert(change)
+        finally:
+            self.replaying = False
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.writes = 0
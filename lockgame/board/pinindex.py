@@ -0,0 +1,247 @@
+import math
+from abc import ABC, abstractmethod
+from itertools import groupby
+from operator import itemgetter
+
+import kdtree
+
+
+class PinIndex(ABC):
+    """
+        Base class for spatial indices over pins. Implementations have to
+        provide add, clear, nearest, __iter__ and __len__.
+
+        Queries return a ``(pin, squared distance)`` tuple, or None when no
+        pin qualifies.
+    """
+
+    @abstractmethod
+    def add(self, pin):
+        pass
+
+    def bulk_load(self, pins):
+        """
+            Add many pins at once. Implementations can override this to build
+            their structure in one go instead of inserting pin by pin.
+        """
+
+        for pin in pins:
+            self.add(pin)
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def nearest(self, point):
+        pass
+
+    def within(self, point, radius):
+        """
+            Find the pin nearest to the given point, but only if it lies
+            within the given radius.
+        """
+
+        result = self.nearest(point)
+
+        if result and result[1] <= radius * radius:
+            return result
+
+        return None
+
+    @abstractmethod
+    def __iter__(self):
+        pass
+
+    @abstractmethod
+    def __len__(self):
+        pass
+
+
+class KDTreePinIndex(PinIndex):
+    """
+        Pin index backed by the pure Python kd-tree.
+    """
+
+    def __init__(self):
+        self.tree = kdtree.create(dimensions=2)
+        self.count = 0
+
+    def add(self, pin):
+        self.tree.add(pin)
+        self.count += 1
+
+    def bulk_load(self, pins):
+        pins = list(pins)
+        if not pins:
+            return
+
+        # Build a balanced tree from all pins, instead of inserting them one
+        # by one
+        self.tree = kdtree.create(list(self) + pins, dimensions=2)
+        self.count += len(pins)
+
+    def clear(self):
+        self.tree = kdtree.create(dimensions=2)
+        self.count = 0
+
+    def nearest(self, point):
+        if not self.count:
+            return None
+
+        result = self.tree.search_nn(point)
+
+        if result:
+            return result[0].data, result[1]
+
+        return None
+
+    def __iter__(self):
+        return (node.data for node in self.tree.inorder()
+            if node.data is not None)
+
+    def __len__(self):
+        return self.count
+
+
+class GridPinIndex(PinIndex):
+    """
+        Pin index based on a uniform grid.
+
+        Pins are put in square buckets of ``cell_size``. A query with a radius
+        up to the cell size only has to look at the bucket containing the
+        point and its direct neighbours.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.count = 0
+
+        # Extent of the occupied cells, used to bound nearest() searches
+        self.min_cell = None
+        self.max_cell = None
+
+    def cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def add(self, pin):
+        cell = self.cell(pin.x, pin.y)
+        self.cells.setdefault(cell, []).append(pin)
+        self.count += 1
+
+        self.update_extent(cell, cell)
+
+    def bulk_load(self, pins):
+        # Sort the pins on their cell, so each bucket is filled in one go
+        keyed = sorted(((self.cell(pin.x, pin.y), pin) for pin in pins),
+            key=itemgetter(0))
+        if not keyed:
+            return
+
+        for cell, group in groupby(keyed, key=itemgetter(0)):
+            self.cells.setdefault(cell, []).extend(pin for _, pin in group)
+
+        self.count += len(keyed)
+
+        min_x = keyed[0][0][0]
+        max_x = keyed[-1][0][0]
+        min_y = min(cell[1] for cell, _ in keyed)
+        max_y = max(cell[1] for cell, _ in keyed)
+        self.update_extent((min_x, min_y), (max_x, max_y))
+
+    def clear(self):
+        self.cells.clear()
+        self.count = 0
+        self.min_cell = None
+        self.max_cell = None
+
+    def update_extent(self, min_cell, max_cell):
+        if self.min_cell is None:
+            self.min_cell = min_cell
+            self.max_cell = max_cell
+        else:
+            self.min_cell = (min(self.min_cell[0], min_cell[0]),
+                min(self.min_cell[1], min_cell[1]))
+            self.max_cell = (max(self.max_cell[0], max_cell[0]),
+                max(self.max_cell[1], max_cell[1]))
+
+    def search_cells(self, x, y, cells, best=None, best_dist=math.inf):
+        for cell in cells:
+            for pin in self.cells.get(cell, ()):
+                dist = (pin.x - x)**2 + (pin.y - y)**2
+
+                if dist <= best_dist:
+                    best = pin
+                    best_dist = dist
+
+        return best, best_dist
+
+    def within(self, point, radius):
+        x, y = point
+        min_x, min_y = self.cell(x - radius, y - radius)
+        max_x, max_y = self.cell(x + radius, y + radius)
+
+        cells = ((cx, cy) for cx in range(min_x, max_x + 1)
+            for cy in range(min_y, max_y + 1))
+
+        best, best_dist = self.search_cells(x, y, cells,
+            best_dist=radius * radius)
+
+        if best is None:
+            return None
+
+        return best, best_dist
+
+    def ring(self, center, radius):
+        """
+            All cells at exactly the given Chebyshev distance from the center
+            cell.
+        """
+
+        cx, cy = center
+        if radius == 0:
+            yield center
+            return
+
+        for dx in range(-radius, radius + 1):
+            yield (cx + dx, cy - radius)
+            yield (cx + dx, cy + radius)
+
+        for dy in range(-radius + 1, radius):
+            yield (cx - radius, cy + dy)
+            yield (cx + radius, cy + dy)
+
+    def nearest(self, point):
+        if not self.count:
+            return None
+
+        x, y = point
+        center = self.cell(x, y)
+
+        # Searching further than this ring can't find any more pins
+        max_ring = max(abs(center[0] - self.min_cell[0]),
+            abs(center[0] - self.max_cell[0]),
+            abs(center[1] - self.min_cell[1]),
+            abs(center[1] - self.max_cell[1]))
+
+        best = None
+        best_dist = math.inf
+
+        for radius in range(max_ring + 1):
+            # Every pin in this ring or further is at least this far away
+            ring_dist = max(0, radius - 1) * self.cell_size
+            if best is not None and ring_dist**2 > best_dist:
+                break
+
+            best, best_dist = self.search_cells(x, y,
+                self.ring(center, radius), best, best_dist)
+
+        return best, best_dist
+
+    def __iter__(self):
+        for pins in self.cells.values():
+            yield from pins
+
+    def __len__(self):
+        return self.count
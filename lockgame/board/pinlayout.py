@@ -0,0 +1,286 @@
+"""
+    Pin layouts extracted from a board SVG.
+
+    Pins are the shapes in the "Pins" layer of the SVG which have an inkscape
+    label, the label is the name of the node the pin belongs to. The centres
+    of these shapes are the pin positions, in SVG coordinates.
+
+    Extracting the pins requires parsing the whole SVG, so the result is
+    stored in a sidecar file (``pcb.svg.pins`` for ``pcb.svg``), next to the
+    SVG or in a cache directory.
+    The sidecar is memory mapped when loading, so opening it doesn't parse
+    or copy anything. A board copies the coordinates out of the mapping
+    into its own pins, widening them from float32.
+
+    Sidecar layout, all little endian:
+
+    * Header: magic, version, SVG modification time, pin count, name count
+      and size of the name table in bytes
+    * Pin count float32 x coordinates
+    * Pin count float32 y coordinates
+    * Pin count uint32 node ids, indices in the name table
+    * Name table: node names as UTF-8, separated by NUL bytes
+"""
+
+import math
+import mmap
+import os
+import re
+import struct
+import xml.etree.ElementTree as ElementTree
+
+from lockgame.board.pintable import Pin
+
+MAGIC = b'LKPN'
+VERSION = 1
+HEADER = struct.Struct('<4sIqIII')
+
+PINS_LAYER = 'Pins'
+
+INKSCAPE_LABEL = '{http://www.inkscape.org/namespaces/inkscape}label'
+SVG_NS = '{http://www.w3.org/2000/svg}'
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+TRANSFORM_RE = re.compile(r'(matrix|translate|scale|rotate)\s*\(([^)]*)\)')
+
+
+def multiply(m1, m2):
+    """
+        Returns the affine transform applying m2 first, then m1. Transforms
+        are ``(a, b, c, d, e, f)`` tuples like the SVG matrix() function.
+    """
+
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+
+    return (a1 * a2 + c1 * b2, b1 * a2 + d1 * b2,
+        a1 * c2 + c1 * d2, b1 * c2 + d1 * d2,
+        a1 * e2 + c1 * f2 + e1, b1 * e2 + d1 * f2 + f1)
+
+
+def parse_transform(value):
+    """
+        Parses an SVG transform attribute to a single affine transform.
+    """
+
+    matrix = IDENTITY
+    if not value:
+        return matrix
+
+    for name, args in TRANSFORM_RE.findall(value):
+        args = [float(arg) for arg in args.replace(',', ' ').split()]
+
+        if name == 'matrix':
+            transform = tuple(args)
+        elif name == 'translate':
+            transform = (1.0, 0.0, 0.0, 1.0, args[0],
+                args[1] if len(args) > 1 else 0.0)
+        elif name == 'scale':
+            sy = args[1] if len(args) > 1 else args[0]
+            transform = (args[0], 0.0, 0.0, sy, 0.0, 0.0)
+        else:
+            angle = math.radians(args[0])
+            cos, sin = math.cos(angle), math.sin(angle)
+            transform = (cos, sin, -sin, cos, 0.0, 0.0)
+
+            if len(args) == 3:
+                cx, cy = args[1], args[2]
+                transform = multiply(multiply(
+                    (1.0, 0.0, 0.0, 1.0, cx, cy), transform),
+                    (1.0, 0.0, 0.0, 1.0, -cx, -cy))
+
+        matrix = multiply(matrix, transform)
+
+    return matrix
+
+
+def shape_center(element):
+    """
+        Returns the centre of a rect, circle or ellipse element in its own
+        coordinate system, or None for other elements.
+    """
+
+    tag = element.tag
+    get = element.get
+
+    if tag == SVG_NS + 'rect':
+        return (float(get('x', 0)) + float(get('width', 0)) / 2,
+            float(get('y', 0)) + float(get('height', 0)) / 2)
+    elif tag in (SVG_NS + 'circle', SVG_NS + 'ellipse'):
+        return float(get('cx', 0)), float(get('cy', 0))
+
+    return None
+
+
+def import_pins(svg_file):
+    """
+        Reads the labelled pins from the pins layer of an SVG file.
+
+        Returns a list of pins in SVG coordinates.
+    """
+
+    pins = []
+
+    # Transforms of all open elements, and the depth at which we entered the
+    # pins layer
+    transforms = [IDENTITY]
+    pins_depth = None
+
+    for event, element in ElementTree.iterparse(svg_file,
+            events=('start', 'end')):
+        if event == 'end':
+            transforms.pop()
+            if pins_depth == len(transforms):
+                pins_depth = None
+
+            element.clear()
+            continue
+
+        matrix = multiply(transforms[-1],
+            parse_transform(element.get('transform')))
+        transforms.append(matrix)
+
+        label = element.get(INKSCAPE_LABEL)
+        if label is None:
+            continue
+
+        if pins_depth is None:
+            if label == PINS_LAYER and element.tag == SVG_NS + 'g':
+                pins_depth = len(transforms) - 1
+
+            continue
+
+        center = shape_center(element)
+        if center is None:
+            continue
+
+        a, b, c, d, e, f = matrix
+        x, y = center
+        pins.append(Pin(a * x + c * y + e, b * x + d * y + f, label))
+
+    return pins
+
+
+def pack_layout(pins, svg_mtime):
+    """
+        Packs pins in the sidecar format, to be loaded with PinLayout.
+    """
+
+    names = []
+    name_ids = {}
+    nodes = []
+
+    for pin in pins:
+        if pin.node not in name_ids:
+            name_ids[pin.node] = len(names)
+            names.append(pin.node)
+
+        nodes.append(name_ids[pin.node])
+
+    name_table = b'\0'.join(name.encode('utf-8') for name in names)
+    count = len(pins)
+
+    return b''.join([
+        HEADER.pack(MAGIC, VERSION, svg_mtime, count, len(names),
+            len(name_table)),
+        struct.pack('<%df' % count, *(pin.x for pin in pins)),
+        struct.pack('<%df' % count, *(pin.y for pin in pins)),
+        struct.pack('<%dI' % count, *nodes),
+        name_table
+    ])
+
+
+class PinLayout:
+    """
+        A pin layout in the sidecar format, on top of any buffer. Use
+        PinLayout.open to map a sidecar file.
+
+        ``xs``, ``ys`` and ``nodes`` are memoryviews on the buffer, with the
+        coordinates in SVG coordinates and node ids indexing ``names``.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+        magic, version, self.svg_mtime, count, name_count, names_size = (
+            HEADER.unpack_from(buffer))
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a pin layout")
+
+        size = count * 4
+        view = memoryview(buffer)[HEADER.size:]
+
+        self.xs = view[0:size].cast('f')
+        self.ys = view[size:2 * size].cast('f')
+        self.nodes = view[2 * size:3 * size].cast('I')
+
+        names = view[3 * size:3 * size + names_size].tobytes()
+        self.names = [name.decode('utf-8') for name in names.split(b'\0')
+            if name_count]
+
+        if len(self.names) != name_count or len(self.nodes) != count:
+            raise ValueError("Corrupt pin layout")
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __iter__(self):
+        names = self.names
+
+        for x, y, node in zip(self.xs, self.ys, self.nodes):
+            yield Pin(x, y, names[node])
+
+
+def sidecar_path(svg_file, cache_dir=None):
+    if cache_dir is None:
+        return svg_file + '.pins'
+
+    return os.path.join(cache_dir, os.path.basename(svg_file) + '.pins')
+
+
+def load_pin_layout(svg_file, cache_dir=None):
+    """
+        Returns the PinLayout for an SVG file, importing the pins and writing
+        the sidecar first if it is missing or older than the SVG. The sidecar
+        is kept in cache_dir when given, otherwise next to the SVG.
+
+        Importing parses the whole SVG, so avoid calling this on the main
+        thread.
+
+        Returns None when the SVG has no labelled pins.
+    """
+
+    path = sidecar_path(svg_file, cache_dir)
+    svg_mtime = os.stat(svg_file).st_mtime_ns
+
+    try:
+        layout = PinLayout.open(path)
+    except (OSError, ValueError, struct.error):
+        layout = None
+
+    if layout is None or layout.svg_mtime != svg_mtime:
+        data = pack_layout(import_pins(svg_file), svg_mtime)
+
+        try:
+            if cache_dir is not None:
+                os.makedirs(cache_dir, exist_ok=True)
+
+            # Replace the sidecar instead of truncating it, an older layout
+            # may still have it mapped
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            # Can't write the sidecar, the layout is imported again next time
+            pass
+
+        layout = PinLayout(data)
+
+    return layout if len(layout) else None
@@ -0,0 +1,205 @@
+import sys
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from lockgame.vector import Vec2d
+
+# Upper bound on the number of elements in the temporary distance matrix of a
+# batch query, queries are split in chunks to stay below this
+BATCH_ELEMENTS = 1 << 22
+
+
+class Pin:
+    """
+        A lightweight handle for a single pin.
+
+        Pins are accessible by indices, as required by the KDtree. We also
+        operate in 2D, so that's why it returns 2 for __len__.
+
+        Node names are interned, so all pins of the same node share a single
+        string.
+    """
+
+    __slots__ = ['x', 'y', 'node']
+
+    def __init__(self, x=0.0, y=0.0, node=''):
+        self.x = x
+        self.y = y
+        self.node = sys.intern(node)
+
+    def as_vector(self):
+        return Vec2d(self.x, self.y)
+
+    def __getitem__(self, index):
+        if index == 0:
+            return self.x
+        elif index == 1:
+            return self.y
+        else:
+            raise IndexError("Index out of bounds")
+
+    def __eq__(self, other):
+        return self.x == other.x and self.y == other.y
+
+    def __len__(self):
+        return 2
+
+    def __repr__(self):
+        return 'Pin(%s, %s, %r)' % (self.x, self.y, self.node)
+
+
+class PinTable:
+    """
+        All pins of a board in insertion order.
+
+        The table creates its own pins, which hold their coordinates as
+        float attributes, so reading them doesn't allocate. Coordinate
+        columns are only built when needed: a NumPy array for batch queries,
+        cached until pins are added, and arrays for saving snapshots. The
+        pins of each node are kept in ``node_pins``, keyed by node name.
+    """
+
+    def __init__(self):
+        self.pins = []
+        self.node_pins = {}
+
+        self._coordinates = None
+
+    def __len__(self):
+        return len(self.pins)
+
+    def __iter__(self):
+        return iter(self.pins)
+
+    def __getitem__(self, index):
+        return self.pins[index]
+
+    def load(self, pins, height=None):
+        """
+            Append pins to the table. The table creates its own pins for
+            them, which are returned. The given pins are left untouched, so
+            the same list can be loaded in multiple tables.
+
+            When height is given, the pins are in inkscape coordinates, which
+            put the (0, 0) point in the bottom left corner instead of the top
+            left corner. The y coordinates are flipped against the given
+            height while loading.
+        """
+
+        if height is None:
+            loaded = [Pin(pin.x, pin.y, pin.node) for pin in pins]
+        else:
+            loaded = [Pin(pin.x, height - pin.y, pin.node) for pin in pins]
+
+        return self._append(loaded)
+
+    def load_layout(self, layout):
+        """
+            Append all pins of a PinLayout, which are in SVG coordinates
+            already. The float32 coordinates are copied out of the layout
+            columns and widened to floats, so the layout doesn't have to stay
+            open. Returns the new pins.
+        """
+
+        names = [sys.intern(name) for name in layout.names]
+
+        return self._append([Pin(x, y, names[node])
+            for x, y, node in zip(layout.xs, layout.ys, layout.nodes)])
+
+    def matches(self, layout):
+        """
+            Whether this table holds exactly the pins of a pin layout, in the
+            same order.
+        """
+
+        if len(layout) != len(self.pins):
+            return False
+
+        names = layout.names
+
+        return all(pin.x == x and pin.y == y and pin.node == names[node]
+            for pin, x, y, node in zip(self.pins, layout.xs, layout.ys,
+                layout.nodes))
+
+    def columns(self):
+        """
+            Returns ``array('d')`` columns with the x and y coordinates of
+            all pins.
+        """
+
+        pins = self.pins
+
+        return (array('d', [pin.x for pin in pins]),
+            array('d', [pin.y for pin in pins]))
+
+    def _append(self, loaded):
+        self.pins.extend(loaded)
+        self._coordinates = None
+
+        node_pins = self.node_pins
+        for pin in loaded:
+            node_pins.setdefault(pin.node, []).append(pin)
+
+        return loaded
+
+    def coordinates(self):
+        """
+            Returns an (n, 2) NumPy array with the coordinates of all pins.
+        """
+
+        if numpy is None:
+            raise RuntimeError("Batch pin queries require NumPy")
+
+        if self._coordinates is None:
+            xs, ys = self.columns()
+            self._coordinates = numpy.column_stack((
+                numpy.frombuffer(xs, dtype=numpy.float64),
+                numpy.frombuffer(ys, dtype=numpy.float64)
+            ))
+
+        return self._coordinates
+
+    def nearest(self, points, radius=None):
+        """
+            Find the nearest pin for each of the given points.
+
+            Returns two arrays: the index of the nearest pin in this table and
+            the squared distance to it. When a radius is given, points
+            without a pin within that radius get index -1. The same happens
+            for all points when the table is empty.
+        """
+
+        coordinates = self.coordinates()
+        points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+
+        indices = numpy.full(len(points), -1, dtype=numpy.intp)
+        distances = numpy.full(len(points), numpy.inf)
+
+        if not len(coordinates):
+            return indices, distances
+
+        xs = coordinates[:, 0]
+        ys = coordinates[:, 1]
+        chunk = max(1, BATCH_ELEMENTS // len(coordinates))
+
+        for start in range(0, len(points), chunk):
+            block = points[start:start + chunk]
+
+            dx = block[:, 0, numpy.newaxis] - xs
+            dy = block[:, 1, numpy.newaxis] - ys
+            dist = dx * dx
+            dist += dy * dy
+
+            nearest = dist.argmin(axis=1)
+            indices[start:start + len(block)] = nearest
+            distances[start:start + len(block)] = dist[
+                numpy.arange(len(block)), nearest]
+
+        if radius is not None:
+            indices[distances > radius * radius] = -1
+
+        return indices, distances
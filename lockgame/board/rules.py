@@ -0,0 +1,154 @@
+"""
+    Conditions on the connectivity of a board, declared as short expressions:
+
+    * ``A~B``: nodes A and B are connected
+    * ``A!~B``: nodes A and B are not connected
+    * ``size(A)==N``: the component of node A has N nodes, the other
+      comparison operators (``!=``, ``<``, ``<=``, ``>``, ``>=``) work too
+
+    Expressions are compiled once to closures over the union find structure.
+    A RuleSet only evaluates the rules watching a node in one of the
+    components touched by a change.
+"""
+
+import operator
+import re
+from collections import namedtuple
+
+CONNECTED_RE = re.compile(r'^\s*([^\s~!]+)\s*(!?~)\s*([^\s~!]+)\s*$')
+SIZE_RE = re.compile(
+    r'^\s*size\(\s*([^\s)]+)\s*\)\s*(==|!=|<=|>=|<|>)\s*([0-9]+)\s*$')
+
+COMPARISONS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+# A compiled rule: the union find ids of the nodes it depends on, and a
+# function without arguments evaluating it
+Rule = namedtuple('Rule', ['expression', 'node_ids', 'test'])
+
+
+def compile_rule(expression, union_find):
+    """
+        Compiles a rule expression against a union find structure. Nodes
+        which are not known yet are registered as singleton components.
+    """
+
+    find = union_find.find_id
+
+    match = CONNECTED_RE.match(expression)
+    if match:
+        a = union_find.add(match.group(1))
+        b = union_find.add(match.group(3))
+
+        connected = match.group(2) == '~'
+
+        def test():
+            return (find(a) == find(b)) == connected
+
+        return Rule(expression, (a, b), test)
+
+    match = SIZE_RE.match(expression)
+    if match:
+        a = union_find.add(match.group(1))
+        compare = COMPARISONS[match.group(2)]
+        size = int(match.group(3))
+
+        def test():
+            return compare(union_find.size_array[find(a)], size)
+
+        return Rule(expression, (a,), test)
+
+    raise ValueError("Invalid rule: {}".format(expression))
+
+
+class RuleSet:
+    """
+        A set of rules over the components of a board, keyed by their
+        expression.
+
+        Watched nodes are kept in buckets per union find root. After a
+        change, only the rules watching a node in the bucket of one of the
+        changed roots are evaluated again, and only those nodes are moved
+        to their new buckets.
+    """
+
+    def __init__(self, union_find, expressions):
+        self.union_find = union_find
+        self.rules = {}
+        self.results = {}
+
+        # Union find id of a watched node to the expressions watching it, and
+        # the watched nodes of each component by their root
+        self.watchers = {}
+        self.buckets = {}
+
+        for expression in expressions:
+            self.add(expression)
+
+    def __getitem__(self, expression):
+        return self.results[expression]
+
+    def __contains__(self, expression):
+        return expression in self.rules
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add(self, expression):
+        if expression in self.rules:
+            return
+
+        rule = compile_rule(expression, self.union_find)
+        self.rules[expression] = rule
+
+        for node_id in rule.node_ids:
+            if node_id not in self.watchers:
+                self.watchers[node_id] = []
+                root = self.union_find.find_id(node_id)
+                self.buckets.setdefault(root, set()).add(node_id)
+
+            self.watchers[node_id].append(expression)
+
+        self.results[expression] = rule.test()
+
+    def all(self, expressions):
+        results = self.results
+
+        return all(results[expression] for expression in expressions)
+
+    def update(self, roots):
+        """
+            Evaluate the rules affected by a change of the components with
+            the given roots (from before the change).
+
+            Returns the set of expressions whose result changed.
+        """
+
+        find = self.union_find.find_id
+        buckets = self.buckets
+
+        # Watched nodes of the changed components, these may have a new root
+        moved = []
+        for root in roots:
+            moved.extend(buckets.pop(root, ()))
+
+        affected = set()
+        for node_id in moved:
+            buckets.setdefault(find(node_id), set()).add(node_id)
+            affected.update(self.watchers[node_id])
+
+        changed = set()
+        for expression in affected:
+            result = self.rules[expression].test()
+
+            if result != self.results[expression]:
+                self.results[expression] = result
+                changed.add(expression)
+
+        return changed
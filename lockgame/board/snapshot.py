@@ -0,0 +1,122 @@
+"""
+    Binary snapshots of a board: its pins, connections and union find state.
+
+    The union find parents and sizes are stored as they are, so restoring a
+    snapshot doesn't have to replay the unions of all connections. Snapshot
+    files are memory mapped when loading.
+
+    Snapshot layout, all little endian:
+
+    * Header: magic, version, pin count, node count, connection count and
+      size of the name table in bytes
+    * Pin count float64 x coordinates, in SVG coordinates
+    * Pin count float64 y coordinates
+    * Pin count int32 node ids of the pins
+    * Node count int32 union find parent ids
+    * Node count int32 union find component sizes
+    * Connection count pairs of int32 pin indices
+    * Name table: node names as UTF-8, separated by NUL bytes, indexed by
+      node id
+"""
+
+import mmap
+import struct
+from array import array
+
+MAGIC = b'LKSS'
+VERSION = 1
+HEADER = struct.Struct('<4sIIIII')
+
+
+def pack_snapshot(board):
+    """
+        Returns a snapshot of the board as bytes.
+    """
+
+    table = board.pin_table
+    uf = board.quick_union
+
+    # Pins refer to nodes by their union find id
+    pin_nodes = array('i', (uf.ids[pin.node] for pin in table.pins))
+
+    # Pins do not define a hash, so they are looked up by identity
+    indices = {id(pin): i for i, pin in enumerate(table.pins)}
+    ends = array('i')
+    for connection in board.connections:
+        ends.append(indices[id(connection.pin1)])
+        ends.append(indices[id(connection.pin2)])
+
+    xs, ys = table.columns()
+
+    name_table = b'\0'.join(name.encode('utf-8') for name in uf.names)
+
+    return b''.join([
+        HEADER.pack(MAGIC, VERSION, len(table), len(uf), len(ends) // 2,
+            len(name_table)),
+        xs.tobytes(),
+        ys.tobytes(),
+        pin_nodes.tobytes(),
+        uf.parents.tobytes(),
+        uf.size_array.tobytes(),
+        ends.tobytes(),
+        name_table
+    ])
+
+
+def save_snapshot(board, path):
+    with open(path, 'wb') as f:
+        f.write(pack_snapshot(board))
+
+
+class Snapshot:
+    """
+        A board snapshot on top of any buffer. Use Snapshot.open to map a
+        snapshot file.
+
+        ``xs``, ``ys``, ``nodes``, ``parents``, ``sizes`` and ``ends`` are
+        memoryviews on the buffer. The pin columns have the same form as a
+        PinLayout, so they can be loaded into a PinTable directly.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+        magic, version, pin_count, node_count, connection_count, names_size = (
+            HEADER.unpack_from(buffer))
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a board snapshot")
+
+        view = memoryview(buffer)
+        offset = HEADER.size
+
+        def take(fmt, count):
+            nonlocal offset
+            size = struct.calcsize(fmt) * count
+            column = view[offset:offset + size].cast(fmt)
+            offset += size
+
+            return column
+
+        self.xs = take('d', pin_count)
+        self.ys = take('d', pin_count)
+        self.nodes = take('i', pin_count)
+        self.parents = take('i', node_count)
+        self.sizes = take('i', node_count)
+        self.ends = take('i', connection_count * 2)
+
+        names = view[offset:offset + names_size].tobytes()
+        self.names = [name.decode('utf-8') for name in names.split(b'\0')
+            if node_count]
+
+        if (len(self.names) != node_count or
+                len(self.ends) != connection_count * 2):
+            raise ValueError("Corrupt board snapshot")
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return len(self.xs)
@@ -0,0 +1,316 @@
+from array import array
+
+
+class ComponentSizes:
+    """
+        Read-only mapping from a node name to the size of the component it
+        belongs to.
+
+        Looking up a node which is not a root still gives the size of its
+        whole component.
+    """
+
+    def __init__(self, union_find):
+        self.union_find = union_find
+
+    def __getitem__(self, node):
+        uf = self.union_find
+
+        return uf.size_array[uf.find_id(uf.ids[node])]
+
+    def __contains__(self, node):
+        return node in self.union_find.ids
+
+    def __len__(self):
+        return len(self.union_find.ids)
+
+
+class UnionFind:
+    """
+        Union find with path halving and union by size.
+
+        Node names (for example 'PB0' or 'VCC') are interned to integer ids,
+        the parent pointers and component sizes are stored in compact integer
+        arrays indexed by these ids.
+
+        The members of each component form a circular linked list in the
+        ``links`` array, a union splices the two lists in constant time. So
+        listing the members of a component only costs its size.
+
+        Boards do not use this class, but RollbackUnionFind. That gives up
+        path halving so edits can be undone, which makes finds O(log n)
+        instead of nearly constant. Every connectivity check pays for this,
+        including rules and net lookups while hovering.
+    """
+
+    def __init__(self, nodes=()):
+        self.ids = {}
+        self.names = []
+
+        self.parents = array('i')
+        self.size_array = array('i')
+        self.links = array('i')
+        self.sizes = ComponentSizes(self)
+
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, node):
+        return node in self.ids
+
+    def add(self, node):
+        """
+            Register a new node as a singleton component. Adding an existing
+            node is a no-op. Returns the integer id of the node.
+        """
+
+        node_id = self.ids.get(node)
+        if node_id is not None:
+            return node_id
+
+        node_id = len(self.names)
+        self.ids[node] = node_id
+        self.names.append(node)
+        self.parents.append(node_id)
+        self.size_array.append(1)
+        self.links.append(node_id)
+
+        return node_id
+
+    def find_id(self, i):
+        parents = self.parents
+
+        while i != parents[i]:
+            # Path halving: point every other node on the path to its
+            # grandparent
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+
+        return i
+
+    def find(self, p):
+        return self.names[self.find_id(self.ids[p])]
+
+    def union(self, p, q):
+        i = self.find_id(self.ids[p])
+        j = self.find_id(self.ids[q])
+
+        if i == j:
+            return
+
+        sizes = self.size_array
+        if sizes[i] < sizes[j]:
+            i, j = j, i
+
+        self.parents[j] = i
+        sizes[i] += sizes[j]
+
+        links = self.links
+        links[i], links[j] = links[j], links[i]
+
+    def connected(self, p, q):
+        ids = self.ids
+
+        return self.find_id(ids[p]) == self.find_id(ids[q])
+
+    def net_id(self, node):
+        """
+            Returns the id of the root of the component of a node, which
+            identifies the component until the next change.
+        """
+
+        return self.find_id(self.ids[node])
+
+    def size(self, node):
+        return self.size_array[self.find_id(self.ids[node])]
+
+    def member_ids(self, i):
+        """
+            Returns the ids of all nodes in the component of node id i.
+        """
+
+        links = self.links
+        members = [i]
+
+        j = links[i]
+        while j != i:
+            members.append(j)
+            j = links[j]
+
+        return members
+
+    def members(self, node):
+        """
+            Returns the names of all nodes in the component of a node.
+        """
+
+        names = self.names
+
+        return [names[i] for i in self.member_ids(self.ids[node])]
+
+    def reset(self, nodes):
+        """
+            Turn each of the given nodes back into a singleton component.
+
+            Only use this for a set of nodes which together form complete
+            components, otherwise nodes outside the set could still point to
+            one of the reset nodes.
+        """
+
+        parents = self.parents
+        sizes = self.size_array
+        links = self.links
+
+        for node in nodes:
+            i = self.ids[node]
+            parents[i] = i
+            sizes[i] = 1
+            links[i] = i
+
+    def restore(self, names, parents, sizes):
+        """
+            Replace the state of this structure by a saved one: the node
+            names, and buffers with the parent ids and component sizes
+            indexed by node id, as found in ``names``, ``parents`` and
+            ``size_array``.
+
+            Nodes which are known already keep their id. When the saved
+            names start with the current names, which is the case for a
+            state saved from the same board, the arrays are copied over
+            as a whole.
+        """
+
+        names = list(names)
+
+        if names[:len(self.names)] == self.names:
+            self.names = names
+            self.ids = {name: i for i, name in enumerate(names)}
+
+            self.parents = array('i')
+            self.parents.frombytes(memoryview(parents).cast('B'))
+            self.size_array = array('i')
+            self.size_array.frombytes(memoryview(sizes).cast('B'))
+
+            self.link_members()
+            return
+
+        # Map the saved ids on our own, nodes which are not in the saved
+        # state become singletons
+        ids = [self.add(name) for name in names]
+
+        for i in range(len(self.names)):
+            self.parents[i] = i
+            self.size_array[i] = 1
+
+        for saved_id, node_id in enumerate(ids):
+            self.parents[node_id] = ids[parents[saved_id]]
+            self.size_array[node_id] = sizes[saved_id]
+
+        self.link_members()
+
+    def link_members(self):
+        """
+            Rebuild the member lists from the parent pointers.
+        """
+
+        find = self.find_id
+        links = self.links = array('i', range(len(self.names)))
+
+        for i in range(len(links)):
+            root = find(i)
+            if root != i:
+                links[i] = links[root]
+                links[root] = i
+
+
+class RollbackUnionFind(UnionFind):
+    """
+        Union find with union by size, but without path compression, which
+        can roll back its changes.
+
+        While ``log`` is a list, every write to the parents, sizes and member
+        links is appended to it as a ``(array, id, old value, new value)``
+        tuple. Resets log a single entry per array, with lists of ids and
+        values instead. Finds never write, so a log can be rolled back
+        exactly with revert, no matter which finds happened since. Without
+        compression the trees stay at most logarithmic in depth thanks to
+        union by size, so a find costs O(log n) rather than the nearly
+        constant time of UnionFind.
+    """
+
+    def __init__(self, nodes=()):
+        self.log = None
+
+        super().__init__(nodes)
+
+    def write(self, column, i, value):
+        if self.log is not None:
+            self.log.append((column, i, column[i], value))
+
+        column[i] = value
+
+    def write_many(self, column, ids, values):
+        if self.log is not None:
+            self.log.append((column, ids, [column[i] for i in ids], values))
+
+        for i, value in zip(ids, values):
+            column[i] = value
+
+    def find_id(self, i):
+        parents = self.parents
+
+        while i != parents[i]:
+            i = parents[i]
+
+        return i
+
+    def union(self, p, q):
+        i = self.find_id(self.ids[p])
+        j = self.find_id(self.ids[q])
+
+        if i == j:
+            return
+
+        sizes = self.size_array
+        if sizes[i] < sizes[j]:
+            i, j = j, i
+
+        write = self.write
+        links = self.links
+
+        write(self.parents, j, i)
+        write(sizes, i, sizes[i] + sizes[j])
+
+        link = links[i]
+        write(links, i, links[j])
+        write(links, j, link)
+
+    def reset(self, nodes):
+        if self.log is None:
+            super().reset(nodes)
+            return
+
+        ids = self.ids
+        reset = [ids[node] for node in nodes]
+
+        self.write_many(self.parents, reset, reset)
+        self.write_many(self.size_array, reset, [1] * len(reset))
+        self.write_many(self.links, reset, reset)
+
+    def revert(self, writes):
+        """
+            Undo the writes of a log, newest first. The undoing writes are
+            logged as well when logging, and revert those again.
+        """
+
+        write = self.write
+        write_many = self.write_many
+
+        for column, i, value, new_value in reversed(writes):
+            if type(i) is list:
+                write_many(column, i, value)
+            else:
+                write(column, i, value)
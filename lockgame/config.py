@@ -2,3 +2,4 @@ import os
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "data")
 USER_PATH = os.path.join(os.path.expanduser('~'), '.lockgame')
+CACHE_PATH = os.path.join(USER_PATH, 'cache')
@@ -1,11 +1,13 @@
 import os
 import random
+import threading
 import webbrowser
 
 from gi.repository import GObject, GLib
 
-from lockgame.config import DATA_PATH
-from lockgame.widgets.pcb import PinManager, Pin
+from lockgame.config import DATA_PATH, CACHE_PATH
+from lockgame.board import Pin, RuleSet, load_pin_layout
+from lockgame.widgets.pcb import PinManager
 from lockgame.shell_manager import ShellManager
 from lockgame import commands
 
@@ -78,6 +80,21 @@ PINS = [
     Pin(264.5, 267.25, 'PF5')
 ]
 
+# The lock shell gives root access when these pins are pulled up or down
+UNLOCK_RULES = [
+    'PB0~VCC', 'PB1~VCC', 'PB2~GND', 'PB3~VCC',
+    'PB4~VCC', 'PB5~GND', 'PB6~GND'
+]
+
+# The lock shell is disabled when any of these fail, the JTAG pins should be
+# left alone
+TAMPER_RULES = [
+    'size(PF7)==1', 'size(PF6)==1', 'size(PF5)==1', 'size(PF4)==1',
+    'VCC!~GND'
+]
+
+SHORT_RULE = 'VCC~GND'
+
 class Game(GObject.GObject):
     __gsignals__ = {
         'change-shell': (GObject.SIGNAL_RUN_FIRST, None, (ShellManager,))
@@ -85,8 +102,18 @@ class Game(GObject.GObject):
 
     def __init__(self):
         GObject.GObject.__init__(self)
-        self.pin_manager = PinManager(os.path.join(DATA_PATH, "pcb.svg"), PINS)
-        self.pin_manager.connect('connection-change', self.on_change_connection)
+
+        # The pins are added by load_pins, reading them from the SVG takes
+        # too long to do while starting up
+        self.svg_file = os.path.join(DATA_PATH, "pcb.svg")
+        self.pin_manager = PinManager(self.svg_file)
+
+        # Win conditions are only evaluated for the parts of the board which
+        # change
+        board = self.pin_manager.board
+        self.rules = RuleSet(board.quick_union,
+            UNLOCK_RULES + TAMPER_RULES + [SHORT_RULE])
+        board.add_listener(self.on_board_change)
 
         self.laptop_shell = ShellManager("zsh", "dorus", "laptop")
         self.laptop_shell.change_directory("/home/dorus/")
@@ -106,39 +133,41 @@ class Game(GObject.GObject):
 
         self.lock_disabled = False
 
-    def change_shell(self, shell):
-        GLib.idle_add(lambda: self.emit('change-shell', shell))
+    def load_pins(self):
+        """
+            Load the pins labelled in the SVG on a background thread, or use
+            PINS when it has none. The pins are added to the board on the
+            main loop once loaded.
+        """
 
-    def on_change_connection(self, sender):
-        pb_connected = []
-        pb_connected.append(self.pin_manager.nodes_connected('PB0', 'VCC'))
-        pb_connected.append(self.pin_manager.nodes_connected('PB1', 'VCC'))
-        pb_connected.append(self.pin_manager.nodes_connected('PB2', 'GND'))
-        pb_connected.append(self.pin_manager.nodes_connected('PB3', 'VCC'))
+        def add_pins(pins):
+            self.pin_manager.add_pins(pins)
+            return False
 
-        pb_connected.append(self.pin_manager.nodes_connected('PB4', 'VCC'))
-        pb_connected.append(self.pin_manager.nodes_connected('PB5', 'GND'))
-        pb_connected.append(self.pin_manager.nodes_connected('PB6', 'GND'))
+        def load():
+            layout = load_pin_layout(self.svg_file, CACHE_PATH)
+            GLib.idle_add(add_pins, layout or PINS)
 
-        if all(pb_connected):
-            self.lock_shell.user = "root"
-        else:
-            self.lock_shell.user = "user"
+        threading.Thread(target=load, daemon=True).start()
+
+    def change_shell(self, shell):
+        GLib.idle_add(lambda: self.emit('change-shell', shell))
 
-        # Disable lock shell when tampered with JTAG connections
-        conditions = []
-        conditions.append(self.pin_manager.quick_union.sizes['PF7'] == 1)
-        conditions.append(self.pin_manager.quick_union.sizes['PF6'] == 1)
-        conditions.append(self.pin_manager.quick_union.sizes['PF5'] == 1)
-        conditions.append(self.pin_manager.quick_union.sizes['PF4'] == 1)
-        conditions.append(not self.pin_manager.nodes_connected('VCC', 'GND'))
+    def on_board_change(self, board, change):
+        changed = self.rules.update(change.roots)
 
-        print(conditions)
+        if changed:
+            if self.rules.all(UNLOCK_RULES):
+                self.lock_shell.user = "root"
+            else:
+                self.lock_shell.user = "user"
 
-        self.lock_disabled = not all(conditions)
+            # Disable lock shell when tampered with JTAG connections
+            self.lock_disabled = not self.rules.all(TAMPER_RULES)
 
-        # If VCC and GND are connected show movie
-        if self.pin_manager.nodes_connected('VCC', 'GND'):
+        # If VCC and GND are connected show movie, on every change of the
+        # connections
+        if self.rules[SHORT_RULE]:
             webbrowser.open("https://www.youtube.com/watch?v=heE4p5nvjro")
 
     def open_troll_video(self):
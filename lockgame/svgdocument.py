@@ -0,0 +1,149 @@
+import os
+import re
+import threading
+import xml.etree.ElementTree as ElementTree
+
+from gi.repository import Rsvg
+
+# Resolution librsvg uses to convert physical units to pixels
+DPI = 90.0
+
+UNITS = {
+    '': 1.0,
+    'px': 1.0,
+    'in': DPI,
+    'cm': DPI / 2.54,
+    'mm': DPI / 25.4,
+    'pt': DPI / 72,
+    'pc': DPI / 6,
+}
+
+LENGTH_RE = re.compile(r'^\s*([-+]?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?)'
+    r'\s*([a-z]*)\s*$')
+
+_documents = {}
+_documents_lock = threading.Lock()
+
+
+def parse_length(value):
+    """
+        Converts an SVG length attribute to pixels. Returns None for missing
+        values and for units which depend on the context, like percentages.
+    """
+
+    if value is None:
+        return None
+
+    match = LENGTH_RE.match(value)
+    if not match or match.group(2) not in UNITS:
+        return None
+
+    return float(match.group(1)) * UNITS[match.group(2)]
+
+
+def read_size(path):
+    """
+        Reads the intrinsic width and height of an SVG file from the
+        attributes of its root element, without parsing the rest of the
+        document. Returns None when the size can't be determined this way.
+    """
+
+    with open(path, 'rb') as f:
+        for event, element in ElementTree.iterparse(f, events=('start',)):
+            width = parse_length(element.get('width'))
+            height = parse_length(element.get('height'))
+
+            view_box = element.get('viewBox')
+            if view_box and (width is None or height is None):
+                parts = view_box.replace(',', ' ').split()
+                if len(parts) == 4:
+                    width = width or float(parts[2])
+                    height = height or float(parts[3])
+
+            if width is None or height is None:
+                return None
+
+            return width, height
+
+    return None
+
+
+class SVGDocument:
+    """
+        An SVG file which is only parsed by librsvg when it is first needed.
+
+        The intrinsic size is read from the root element, which is enough to
+        convert between inkscape and window coordinates. Use load_document
+        to get the shared instance for a file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        self._size = None
+        self._handle = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._handle is not None
+
+    @property
+    def size(self):
+        if self._size is None:
+            self._size = read_size(self.path)
+
+            if self._size is None:
+                props = self.handle.props
+                self._size = (props.width, props.height)
+
+        return self._size
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    @property
+    def handle(self):
+        """
+            The Rsvg.Handle for this document, the file is parsed on first
+            access. Safe to use from multiple threads.
+        """
+
+        with self._lock:
+            if self._handle is None:
+                self._handle = Rsvg.Handle.new_from_file(self.path)
+
+        return self._handle
+
+    def preload(self):
+        """
+            Parse the document on a background thread, if that didn't happen
+            yet.
+        """
+
+        if not self.loaded:
+            threading.Thread(target=lambda: self.handle, daemon=True).start()
+
+
+def load_document(path):
+    """
+        Returns the SVGDocument for the given file. All callers share a
+        single instance per file, until the file is modified.
+    """
+
+    path = os.path.realpath(path)
+    mtime = os.stat(path).st_mtime_ns
+
+    with _documents_lock:
+        cached_mtime, document = _documents.get(path, (None, None))
+
+        if document is None or cached_mtime != mtime:
+            document = SVGDocument(path)
+            _documents[path] = (mtime, document)
+
+    return document
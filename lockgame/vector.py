@@ -2,6 +2,17 @@
 import operator
 import math
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Types which take the scalar fast path in the arithmetic operators
+_SCALARS = frozenset((int, float))
+
+# Creates a FrozenVec2d from a pair, without going through __new__
+_frozen = tuple.__new__
+
 class Vec2d:
     """2d vector class, supports vector and scalar operators,
        and also provides a bunch of high level functions
@@ -9,7 +20,7 @@ class Vec2d:
     __slots__ = ['x', 'y']
 
     def __init__(self, x_or_pair, y=None):
-        if not y:
+        if y is None:
             self.x = x_or_pair[0]
             self.y = x_or_pair[1]
         else:
@@ -52,13 +63,16 @@ class Vec2d:
         else:
             return True
 
-    def __nonzero__(self):
+    def __bool__(self):
         return bool(self.x or self.y)
+    __nonzero__ = __bool__
 
     # Generic operator handlers
     def _o2(self, other, f):
         "Any two-operator operation where the left operand is a Vec2d"
-        if isinstance(other, Vec2d):
+        if type(other) in _SCALARS:
+            return Vec2d(f(self.x, other), f(self.y, other))
+        elif isinstance(other, Vec2d):
             return Vec2d(f(self.x, other.x),
                          f(self.y, other.y))
         elif (hasattr(other, "__getitem__")):
@@ -70,7 +84,9 @@ class Vec2d:
 
     def _r_o2(self, other, f):
         "Any two-operator operation where the right operand is a Vec2d"
-        if (hasattr(other, "__getitem__")):
+        if type(other) in _SCALARS:
+            return Vec2d(f(other, self.x), f(other, self.y))
+        elif (hasattr(other, "__getitem__")):
             return Vec2d(f(other[0], self.x),
                          f(other[1], self.y))
         else:
@@ -79,7 +95,10 @@ class Vec2d:
 
     def _io(self, other, f):
         "inplace operator"
-        if (hasattr(other, "__getitem__")):
+        if type(other) in _SCALARS:
+            self.x = f(self.x, other)
+            self.y = f(self.y, other)
+        elif (hasattr(other, "__getitem__")):
             self.x = f(self.x, other[0])
             self.y = f(self.y, other[1])
         else:
@@ -88,8 +107,14 @@ class Vec2d:
         return self
 
     # Addition
+    # The arithmetic operators have fast paths for the common Vec2d op Vec2d and
+    # Vec2d op scalar cases, everything else is handled generically
     def __add__(self, other):
-        if isinstance(other, Vec2d):
+        if type(other) is Vec2d:
+            return Vec2d(self.x + other.x, self.y + other.y)
+        elif type(other) in _SCALARS:
+            return Vec2d(self.x + other, self.y + other)
+        elif isinstance(other, Vec2d):
             return Vec2d(self.x + other.x, self.y + other.y)
         elif hasattr(other, "__getitem__"):
             return Vec2d(self.x + other[0], self.y + other[1])
@@ -98,7 +123,13 @@ class Vec2d:
     __radd__ = __add__
 
     def __iadd__(self, other):
-        if isinstance(other, Vec2d):
+        if type(other) is Vec2d:
+            self.x += other.x
+            self.y += other.y
+        elif type(other) in _SCALARS:
+            self.x += other
+            self.y += other
+        elif isinstance(other, Vec2d):
             self.x += other.x
             self.y += other.y
         elif hasattr(other, "__getitem__"):
@@ -111,7 +142,11 @@ class Vec2d:
 
     # Subtraction
     def __sub__(self, other):
-        if isinstance(other, Vec2d):
+        if type(other) is Vec2d:
+            return Vec2d(self.x - other.x, self.y - other.y)
+        elif type(other) in _SCALARS:
+            return Vec2d(self.x - other, self.y - other)
+        elif isinstance(other, Vec2d):
             return Vec2d(self.x - other.x, self.y - other.y)
         elif (hasattr(other, "__getitem__")):
             return Vec2d(self.x - other[0], self.y - other[1])
@@ -119,6 +154,8 @@ class Vec2d:
             return Vec2d(self.x - other, self.y - other)
 
     def __rsub__(self, other):
+        if type(other) in _SCALARS:
+            return Vec2d(other - self.x, other - self.y)
         if isinstance(other, Vec2d):
             return Vec2d(other.x - self.x, other.y - self.y)
         if (hasattr(other, "__getitem__")):
@@ -127,7 +164,13 @@ class Vec2d:
             return Vec2d(other - self.x, other - self.y)
 
     def __isub__(self, other):
-        if isinstance(other, Vec2d):
+        if type(other) is Vec2d:
+            self.x -= other.x
+            self.y -= other.y
+        elif type(other) in _SCALARS:
+            self.x -= other
+            self.y -= other
+        elif isinstance(other, Vec2d):
             self.x -= other.x
             self.y -= other.y
         elif (hasattr(other, "__getitem__")):
@@ -140,6 +183,8 @@ class Vec2d:
 
     # Multiplication
     def __mul__(self, other):
+        if type(other) in _SCALARS:
+            return Vec2d(self.x*other, self.y*other)
         if isinstance(other, Vec2d):
             return Vec2d(self.x*other.x, self.y*other.y)
         if (hasattr(other, "__getitem__")):
@@ -149,7 +194,10 @@ class Vec2d:
     __rmul__ = __mul__
 
     def __imul__(self, other):
-        if isinstance(other, Vec2d):
+        if type(other) in _SCALARS:
+            self.x *= other
+            self.y *= other
+        elif isinstance(other, Vec2d):
             self.x *= other.x
             self.y *= other.y
         elif (hasattr(other, "__getitem__")):
@@ -180,13 +228,15 @@ class Vec2d:
         return self._io(other, operator.floordiv)
 
     def __truediv__(self, other):
+        if type(other) in _SCALARS:
+            return Vec2d(self.x/other, self.y/other)
         return self._o2(other, operator.truediv)
 
     def __rtruediv__(self, other):
         return self._r_o2(other, operator.truediv)
 
     def __itruediv__(self, other):
-        return self._io(other, operator.floordiv)
+        return self._io(other, operator.truediv)
 
     # Modulo
     def __mod__(self, other):
@@ -235,10 +285,10 @@ class Vec2d:
 
     # Unary operations
     def __neg__(self):
-        return Vec2d(operator.neg(self.x), operator.neg(self.y))
+        return Vec2d(-self.x, -self.y)
 
     def __pos__(self):
-        return Vec2d(operator.pos(self.x), operator.pos(self.y))
+        return Vec2d(+self.x, +self.y)
 
     def __abs__(self):
         return Vec2d(abs(self.x), abs(self.y))
@@ -251,7 +301,7 @@ class Vec2d:
         return self.x**2 + self.y**2
 
     def get_length(self):
-        return math.sqrt(self.x**2 + self.y**2)
+        return math.hypot(self.x, self.y)
 
     def __setlength(self, value):
         length = self.get_length()
@@ -297,10 +347,10 @@ class Vec2d:
         return math.degrees(math.atan2(cross, dot))
 
     def normalized(self):
-        length = self.length
+        length = math.hypot(self.x, self.y)
         if length != 0:
-            return self/length
-        return Vec2d(self)
+            return Vec2d(self.x/length, self.y/length)
+        return Vec2d(self.x, self.y)
 
     def normalize_return_length(self):
         length = self.length
@@ -349,3 +399,175 @@ class Vec2d:
     def __setstate__(self, dict):
         self.x, self.y = dict
 
+    def frozen(self):
+        return FrozenVec2d(self.x, self.y)
+
+
+class FrozenVec2d(tuple):
+    """Immutable and hashable 2d vector, for use as dictionary key or in sets.
+
+       Supports the same arithmetic as Vec2d, but every operation returns a
+       new FrozenVec2d.
+       """
+    __slots__ = ()
+
+    def __new__(cls, x_or_pair, y=None):
+        if y is None:
+            return tuple.__new__(cls, (x_or_pair[0], x_or_pair[1]))
+        return tuple.__new__(cls, (x_or_pair, y))
+
+    x = property(operator.itemgetter(0))
+    y = property(operator.itemgetter(1))
+
+    def __repr__(self):
+        return 'FrozenVec2d(%s, %s)' % self
+
+    def __add__(self, other):
+        if type(other) in _SCALARS:
+            return _frozen(FrozenVec2d, (self[0] + other, self[1] + other))
+        return _frozen(FrozenVec2d, (self[0] + other[0], self[1] + other[1]))
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if type(other) in _SCALARS:
+            return _frozen(FrozenVec2d, (self[0] - other, self[1] - other))
+        return _frozen(FrozenVec2d, (self[0] - other[0], self[1] - other[1]))
+
+    def __rsub__(self, other):
+        if type(other) in _SCALARS:
+            return _frozen(FrozenVec2d, (other - self[0], other - self[1]))
+        return _frozen(FrozenVec2d, (other[0] - self[0], other[1] - self[1]))
+
+    def __mul__(self, other):
+        if type(other) in _SCALARS:
+            return _frozen(FrozenVec2d, (self[0]*other, self[1]*other))
+        return _frozen(FrozenVec2d, (self[0]*other[0], self[1]*other[1]))
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if type(other) in _SCALARS:
+            return _frozen(FrozenVec2d, (self[0]/other, self[1]/other))
+        return _frozen(FrozenVec2d, (self[0]/other[0], self[1]/other[1]))
+
+    def __neg__(self):
+        return _frozen(FrozenVec2d, (-self[0], -self[1]))
+
+    def __bool__(self):
+        return bool(self[0] or self[1])
+
+    def get_length_sqrd(self):
+        return self[0]**2 + self[1]**2
+
+    def get_length(self):
+        return math.hypot(self[0], self[1])
+
+    length = property(get_length, None, None,
+        "gets the magnitude of the vector")
+
+    def normalized(self):
+        length = math.hypot(self[0], self[1])
+        if length != 0:
+            return _frozen(FrozenVec2d, (self[0]/length, self[1]/length))
+        return self
+
+    def perpendicular(self):
+        return _frozen(FrozenVec2d, (-self[1], self[0]))
+
+    def dot(self, other):
+        return float(self[0]*other[0] + self[1]*other[1])
+
+    def get_distance(self, other):
+        return math.hypot(self[0] - other[0], self[1] - other[1])
+
+    def thawed(self):
+        return Vec2d(self[0], self[1])
+
+
+class Vec2dArray:
+    """Batch of 2d vectors stored as two NumPy arrays.
+
+       Arithmetic with a scalar, a single vector or another Vec2dArray of the
+       same length is applied to all vectors at once.
+       """
+    __slots__ = ['x', 'y']
+
+    def __init__(self, x, y=None):
+        if numpy is None:
+            raise ImportError("Vec2dArray requires NumPy")
+
+        if y is None:
+            # A sequence of (x, y) pairs
+            pairs = numpy.asarray(x, dtype=numpy.float64).reshape(-1, 2)
+            self.x = pairs[:, 0].copy()
+            self.y = pairs[:, 1].copy()
+        else:
+            self.x = numpy.asarray(x, dtype=numpy.float64)
+            self.y = numpy.asarray(y, dtype=numpy.float64)
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Vec2dArray(self.x[index], self.y[index])
+        return Vec2d(float(self.x[index]), float(self.y[index]))
+
+    def __iter__(self):
+        return map(Vec2d, self.x.tolist(), self.y.tolist())
+
+    def __repr__(self):
+        return 'Vec2dArray(%d vectors)' % len(self)
+
+    def _components(self, other):
+        if isinstance(other, Vec2dArray) or isinstance(other, Vec2d):
+            return other.x, other.y
+        elif hasattr(other, "__getitem__"):
+            return other[0], other[1]
+        return other, other
+
+    def __add__(self, other):
+        x, y = self._components(other)
+        return Vec2dArray(self.x + x, self.y + y)
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        x, y = self._components(other)
+        return Vec2dArray(self.x - x, self.y - y)
+
+    def __rsub__(self, other):
+        x, y = self._components(other)
+        return Vec2dArray(x - self.x, y - self.y)
+
+    def __mul__(self, other):
+        x, y = self._components(other)
+        return Vec2dArray(self.x * x, self.y * y)
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        x, y = self._components(other)
+        return Vec2dArray(self.x / x, self.y / y)
+
+    def __neg__(self):
+        return Vec2dArray(-self.x, -self.y)
+
+    def get_length_sqrd(self):
+        return self.x**2 + self.y**2
+
+    def get_length(self):
+        return numpy.hypot(self.x, self.y)
+
+    length = property(get_length, None, None,
+        "gets the magnitudes of all vectors")
+
+    def normalized(self):
+        """Zero length vectors stay zero, like Vec2d.normalized()"""
+        length = self.get_length()
+        safe = numpy.where(length != 0, length, 1.0)
+        return Vec2dArray(self.x / safe, self.y / safe)
+
+    def perpendicular(self):
+        return Vec2dArray(-self.y, self.x)
+
+    def dot(self, other):
+        x, y = self._components(other)
+        return self.x * x + self.y * y
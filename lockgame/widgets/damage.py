@@ -0,0 +1,76 @@
+import math
+
+
+class RectIndex:
+    """
+        Spatial hash of axis aligned rectangles, keyed by an id.
+
+        Used to find the wires which cross a damaged area of a surface
+        without checking every wire on the board.
+    """
+
+    def __init__(self, tile_size=64):
+        self.tile_size = tile_size
+        self.tiles = {}
+        self.rects = {}
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __contains__(self, key):
+        return key in self.rects
+
+    def tiles_for(self, rect):
+        x, y, width, height = rect
+        size = self.tile_size
+
+        min_tx, min_ty = math.floor(x / size), math.floor(y / size)
+        max_tx = math.floor((x + width) / size)
+        max_ty = math.floor((y + height) / size)
+
+        for tx in range(min_tx, max_tx + 1):
+            for ty in range(min_ty, max_ty + 1):
+                yield tx, ty
+
+    def insert(self, key, rect):
+        if key in self.rects:
+            self.remove(key)
+
+        self.rects[key] = rect
+        for tile in self.tiles_for(rect):
+            self.tiles.setdefault(tile, set()).add(key)
+
+    def remove(self, key):
+        rect = self.rects.pop(key)
+
+        for tile in self.tiles_for(rect):
+            keys = self.tiles[tile]
+            keys.discard(key)
+            if not keys:
+                del self.tiles[tile]
+
+        return rect
+
+    def query(self, rect):
+        """
+            Returns the keys of all rectangles intersecting the given one.
+        """
+
+        x, y, width, height = rect
+        found = set()
+
+        for tile in self.tiles_for(rect):
+            for key in self.tiles.get(tile, ()):
+                if key in found:
+                    continue
+
+                other_x, other_y, other_width, other_height = self.rects[key]
+                if (other_x <= x + width and x <= other_x + other_width and
+                        other_y <= y + height and y <= other_y + other_height):
+                    found.add(key)
+
+        return found
+
+    def clear(self):
+        self.tiles.clear()
+        self.rects.clear()
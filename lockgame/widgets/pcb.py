@@ -1,148 +1,179 @@
 import math
+import functools
+from collections import namedtuple
 
-from gi.repository import Gtk, Gdk, Rsvg, GObject
-import kdtree
+from gi.repository import Gtk, Gdk, GLib, GObject
 import cairo
 
 from lockgame.vector import Vec2d
+from lockgame.svgdocument import load_document
+from lockgame.wiregeometry import control_points, wire_geometry
+from lockgame.board import Board, GridPinIndex, Journal
+from lockgame.widgets.damage import RectIndex
+from lockgame.widgets.raster import RasterCache, TileRenderer
+from lockgame.widgets.viewport import Viewport
 
 HIGHLIGHT_RADIUS = 7.5
 
-class WeightedQuickUnion:
-    """
-        Implements union find algorithm, based on quick find
-    """
+# Maximum distance (in SVG coordinates) between the mouse and a pin to be able
+# to select it
+PIN_HIT_RADIUS = 5
 
-    def __init__(self, nodes):
-        self.nodes = nodes
-        self.sizes = {}
+BACKGROUND_COLOR = (1/255, 146/255, 62/255)
 
-        for node in self.nodes:
-            self.sizes[node] = 1
+WIRE_WIDTH = 5
 
-    def find(self, p):
-        while p != self.nodes[p]:
-            p = self.nodes[p]
+# Hovering a pin highlights every pin and wire in its net, the wires are
+# traced with a wider translucent line on top of the wire layer
+NET_HIGHLIGHT_COLOR = (1.0, 0, 0, 0.5)
+NET_HIGHLIGHT_WIDTH = WIRE_WIDTH + 4
 
-        return p
+# Level of detail for wires: wires shorter than LOD_MIN_LENGTH pixels are
+# always drawn as straight lines, and when there are more than LOD_WIRE_COUNT
+# wires they are all drawn straight until the view has settled
+LOD_MIN_LENGTH = 12
+LOD_WIRE_COUNT = 500
 
-    def union(self, p, q):
-        i = self.find(p)
-        j = self.find(q)
+# Changes with more wires than this redraw the whole wire surface, instead of
+# just the area of the changed wires
+REDRAW_WIRE_COUNT = 64
 
-        if i == j:
-            return
-
-        if self.sizes[i] < self.sizes[j]:
-            self.nodes[i] = j
-            self.sizes[j] += self.sizes[i]
-        else:
-            self.nodes[j] = i
-            self.sizes[i] += self.sizes[j]
+# Time in milliseconds the widget size has to stay the same, before the
+# background is rendered again at the exact scale
+RENDER_DELAY = 150
 
-    def connected(self, p, q):
-        return self.find(p) == self.find(q)
-
-class Pin:
-    """
-        A class to be used with the KDtree. For the KD tree the object needs
-        to be accessible by indices.
-
-        We also operate in 2D, so that's why it returns 2 for __len__.
-    """
+# The background is rendered in square tiles of this many pixels, which are
+# cached for each scale
+TILE_SIZE = 256
+TILE_CACHE_SIZE = 192
 
-    def __init__(self, x=0.0, y=0.0, node=''):
-        self.x = x
-        self.y = y
-        self.node = node
+# Zoom factor for a single step of the scroll wheel
+ZOOM_STEP = 1.25
 
-    def as_vector(self):
-        return Vec2d(self.x, self.y)
+# Layer surfaces are allocated in multiples of this size, so they can be
+# reused while resizing
+LAYER_GRANULARITY = 256
 
-    def __getitem__(self, index):
-        if index == 0:
-            return self.x
-        elif index == 1:
-            return self.y
-        else:
-            raise IndexError("Index out of bounds")
+# The parts of a motion event we need, motion events are handled once per
+# frame so we can't hold on to the GDK events themselves
+PointerState = namedtuple('PointerState', ['x', 'y', 'state'])
 
-    def __eq__(self, other):
-        return self.x == other.x and self.y == other.y
+# Cached highlight of a net: cairo paths of its wires and its pins in window
+# coordinates, and the (x, y, width, height) window area they cover
+NetHighlight = namedtuple('NetHighlight', ['wires', 'pins', 'extents'])
 
-    def __len__(self):
-        return 2
+@functools.lru_cache()
+def hex_to_rgb(color):
+    return (color >> 16)/255, ((color & 0xFF00) >> 8)/255, (color & 0xFF)/255
 
 class PinManager(GObject.GObject):
+    """
+        GObject adapter around a Board, emits connection-change with the
+        BoardChange whenever the connections on the board change. Edits are
+        recorded in a Journal, so they can be undone and redone.
+    """
+
     __gsignals__ = {
-        'connection-change': (GObject.SIGNAL_RUN_FIRST, None, ())
+        'connection-change': (GObject.SIGNAL_RUN_FIRST, None, (object,))
     }
 
-    def __init__(self, svg_file, pins):
+    def __init__(self, svg_file, pins=(), pin_index=None):
         GObject.GObject.__init__(self)
 
-        self.svg_handle = Rsvg.Handle.new_from_file(svg_file)
+        # The SVG is only parsed once the board is rendered, the pins just
+        # need its size
+        self.document = load_document(svg_file)
+
+        if pin_index is None:
+            pin_index = GridPinIndex(HIGHLIGHT_RADIUS)
 
-        self.pins = kdtree.create(dimensions=2)
-        self.connections = []
-        self.quick_union = None
+        # Pin coordinates are given in inkscape coordinates, which the board
+        # flips against the height of the SVG
+        self.board = Board(self.document.height, pin_index)
+        self.board.add_listener(self.on_board_change)
+        self.journal = Journal(self.board)
 
         self.add_pins(pins)
 
-    def add_pins(self, pins):
-        if type(pins) == Pin:
-            pins = [pins]
+    @property
+    def svg_handle(self):
+        return self.document.handle
+
+    @property
+    def pins(self):
+        return self.board.pins
+
+    @property
+    def pin_table(self):
+        return self.board.pin_table
+
+    @property
+    def connections(self):
+        return self.board.connections
 
-        for pin in pins:
-            # Pin coordinates are given in inkscape coordinates
-            # which puts the (0, 0) point in the bottom left corner
-            # instead of the top left corner.
-            # The line below fixes the y coordinate.
-            pin.y = self.svg_handle.props.height - pin.y
-            self.pins.add(pin)
+    @property
+    def quick_union(self):
+        return self.board.quick_union
 
-        self.pins.rebalance()
+    def on_board_change(self, board, change):
+        self.emit('connection-change', change)
 
-        # Create quick union datastructure
-        self.quick_union = WeightedQuickUnion({
-            pin.data.node: pin.data.node for pin in self.pins.inorder()})
+    def batch(self):
+        return self.board.batch()
+
+    def add_pins(self, pins):
+        return self.board.add_pins(pins)
 
     def add_connection(self, pin1, pin2):
-        self.connections.append((pin1, pin2))
+        return self.board.add_connection(pin1, pin2)
+
+    def component_nodes(self, node):
+        return self.board.component_nodes(node)
+
+    def net_id(self, node):
+        return self.board.net_id(node)
+
+    def net_members(self, node):
+        return self.board.net_members(node)
 
-        self.quick_union.union(pin1.node, pin2.node)
-        self.emit('connection-change')
+    def net_size(self, node):
+        return self.board.net_size(node)
+
+    def net_pins(self, node):
+        return self.board.net_pins(node)
 
     def remove_connections(self, pin):
-        copy = self.connections
+        return self.board.remove_connections(pin)
 
-        for connection in copy:
-            if connection[0] == pin or connection[1] == pin:
-                self.connections.remove(connection)
+    def undo(self):
+        return self.journal.undo()
 
-        # Unfortunately we have to recreate the whole union find structure here
-        # again
-        self.quick_union = WeightedQuickUnion({
-            pin.data.node: pin.data.node for pin in self.pins.inorder()})
+    def redo(self):
+        return self.journal.redo()
 
-        for pin1, pin2 in self.connections:
-            self.quick_union.union(pin1.node, pin2.node)
+    def save_snapshot(self, path):
+        self.board.save_snapshot(path)
 
-        self.emit('connection-change')
+    def restore_snapshot(self, path):
+        return self.board.restore_snapshot(path)
 
     def pins_connected(self, pin1, pin2):
-        return self.quick_union.connected(pin1.node, pin2.node)
+        return self.board.pins_connected(pin1, pin2)
 
     def nodes_connected(self, node1, node2):
-        return self.quick_union.connected(node1, node2)
+        return self.board.nodes_connected(node1, node2)
 
     def nearest_pin(self, point):
-        result = self.pins.search_nn(point)
+        return self.board.nearest_pin(point)
 
-        if result:
-            return result[0].data
-        else:
-            None
+    def pin_within(self, point, radius):
+        return self.board.pin_within(point, radius)
+
+    def nearest_pins(self, points):
+        return self.board.nearest_pins(points)
+
+    def pins_within(self, points, radius):
+        return self.board.pins_within(points, radius)
 
 class PCBWidget(Gtk.DrawingArea):
     def __init__(self, pin_manager, *args, **kwargs):
@@ -150,51 +181,190 @@ class PCBWidget(Gtk.DrawingArea):
 
         self.pin_manager = pin_manager
 
-        self.scale = 1.0
+        document = pin_manager.document
+        self.viewport = Viewport(document.width, document.height)
+
         self.surface = None
         self.wire_surface = None
         self.new_wire_surface = None
         self.highlight_surface = None
 
-        self.points_to_highlight = []
-        self.highlighted_pins = []
+        # Viewport state at which the background and wire surfaces were
+        # drawn, this lags behind the viewport while resizing, zooming and
+        # panning
+        self.layer_state = None
+        self.layer_size = None
+        self.wire_layer_size = None
+        self.background_size = None
+
+        self.tile_cache = RasterCache(TILE_CACHE_SIZE)
+        self.tile_renderer = TileRenderer(document, TILE_SIZE,
+            BACKGROUND_COLOR)
+        self.render_timeout = None
+        self.detail_timeout = None
+
+        # The background and wire layers change rarely, so they are blended
+        # into a single composite surface. Only the damaged parts of it are
+        # blended again, None means the whole composite is out of date.
+        self.composite_surface = None
+        self.composite_size = None
+        self.composite_damage = None
+
+        self.highlighted_pin = None
+        self.highlighted_net = None
+        self.highlight_extents = None
+        self.highlight_ctx = None
+
+        # Highlights of the nets hovered before, keyed by the union find
+        # root of the net. The paths are in window coordinates for the
+        # viewport state they were created at.
+        self.net_highlights = {}
+        self.net_highlights_state = None
+
         self.new_wire_start = None
 
+        # Window area covered by the preview of the wire being drawn
+        self.new_wire_extents = None
+
+        # Last pointer position while panning with the middle mouse button
+        self.pan_position = None
+
+        # Latest pointer position which still has to be handled, and the
+        # frame clock callback which will handle it
+        self.pending_motion = None
+        self.motion_tick_id = None
+
+        # Window area covered by each wire on the wire surface, keyed by
+        # connection id
+        self.wire_extents = RectIndex()
+
         self.connect('draw', self.on_draw)
         self.connect('configure-event', self.on_configure)
 
+        pin_manager.connect('connection-change', self.on_connection_change)
+
         # Mouse events
         self.connect('motion-notify-event', self.on_motion_notify)
+        self.connect('button-press-event', self.on_button_press)
         self.connect('button-release-event', self.on_button_release)
+        self.connect('scroll-event', self.on_scroll)
 
         self.set_events(
             self.get_events() |
             Gdk.EventMask.LEAVE_NOTIFY_MASK |
+            Gdk.EventMask.SCROLL_MASK |
             Gdk.EventMask.BUTTON_PRESS_MASK |
             Gdk.EventMask.BUTTON_RELEASE_MASK |
             Gdk.EventMask.POINTER_MOTION_MASK
         )
 
     def to_svg_coordinates(self, x, y):
-        allocation = self.get_allocation()
-        ratio_x = self.pin_manager.svg_handle.props.width / allocation.width
-        ratio_y = self.pin_manager.svg_handle.props.height / allocation.height
+        return self.viewport.to_svg(x, y)
 
-        scale = max(ratio_x, ratio_y)
+    def to_window_coordinates(self, x, y):
+        return self.viewport.to_window(x, y)
 
-        return scale * x, scale * y
+    def layers_current(self):
+        """
+            Whether the background and wire surfaces were drawn for the
+            current viewport.
+        """
 
-    def to_window_coordinates(self, x, y):
-        allocation = self.get_allocation()
-        ratio_x = allocation.width / self.pin_manager.svg_handle.props.width
-        ratio_y = allocation.height / self.pin_manager.svg_handle.props.height
+        return self.layer_state == self.viewport.state
+
+    def net_highlight(self, pin):
+        """
+            Returns the NetHighlight for the net of a pin. Highlights are
+            cached until their net changes, or the viewport does.
+        """
+
+        if self.net_highlights_state != self.viewport.state:
+            self.net_highlights.clear()
+            self.net_highlights_state = self.viewport.state
+
+        net = self.pin_manager.net_id(pin.node)
+
+        highlight = self.net_highlights.get(net)
+        if highlight is None:
+            highlight = self.create_net_highlight(pin.node)
+            self.net_highlights[net] = highlight
+
+        return highlight
+
+    def create_net_highlight(self, node):
+        pin_manager = self.pin_manager
+
+        connections = {}
+        for member in pin_manager.net_members(node):
+            for connection in pin_manager.connections.touching_node(member):
+                connections[connection.id] = connection
+
+        connections = list(connections.values())
+        pins = pin_manager.net_pins(node)
+
+        # Same wire shapes as on the wire surface, see stroke_connections
+        x1, y1, x2, y2 = self.wire_ends(connections)
+        geometry = wire_geometry(x1, y1, x2, y2, NET_HIGHLIGHT_WIDTH / 2 + 1)
+
+        ctx = self.highlight_ctx
+        ctx.new_path()
 
-        scale = min(ratio_x, ratio_y)
+        min_length_sqrd = LOD_MIN_LENGTH**2
+        for i in range(len(connections)):
+            ctx.move_to(x1[i], y1[i])
 
-        return scale * x, scale * y
+            if (x2[i] - x1[i])**2 + (y2[i] - y1[i])**2 < min_length_sqrd:
+                ctx.line_to(x2[i], y2[i])
+            else:
+                ctx.curve_to(geometry.c1x[i], geometry.c1y[i],
+                    geometry.c2x[i], geometry.c2y[i], x2[i], y2[i])
+
+        wires = ctx.copy_path()
+        ctx.new_path()
+
+        scale = self.viewport.scale
+        dx, dy = self.viewport.offset_x, self.viewport.offset_y
+        xs = [pin.x * scale + dx for pin in pins]
+        ys = [pin.y * scale + dy for pin in pins]
+        for x, y in zip(xs, ys):
+            ctx.new_sub_path()
+            ctx.arc(x, y, HIGHLIGHT_RADIUS, 0, 2*math.pi)
+
+        pin_paths = ctx.copy_path()
+        ctx.new_path()
+
+        # The wire rectangles have a margin already, the pin circles get an
+        # extra pixel for antialiasing too
+        radius = HIGHLIGHT_RADIUS + 1
+        left = min([x - radius for x in xs] + geometry.rect_x)
+        top = min([y - radius for y in ys] + geometry.rect_y)
+        right = max([x + radius for x in xs] + [x + width
+            for x, width in zip(geometry.rect_x, geometry.rect_width)])
+        bottom = max([y + radius for y in ys] + [y + height
+            for y, height in zip(geometry.rect_y, geometry.rect_height)])
+
+        left = math.floor(left)
+        top = math.floor(top)
+        extents = (left, top, math.ceil(right) - left, math.ceil(bottom) - top)
+
+        return NetHighlight(wires, pin_paths, extents)
 
     def highlight_pin(self, pin):
-        ctx = cairo.Context(self.highlight_surface)
+        """
+            Highlights a pin, and every pin and wire in the same net.
+        """
+
+        highlight = self.net_highlight(pin)
+        ctx = self.highlight_ctx
+        ctx.save()
+
+        ctx.append_path(highlight.wires)
+        ctx.set_source_rgba(*NET_HIGHLIGHT_COLOR)
+        ctx.set_line_width(NET_HIGHLIGHT_WIDTH)
+        ctx.stroke()
+
+        ctx.append_path(highlight.pins)
+        ctx.fill()
 
         # Convert x and y to window coordinates
         scaled_x, scaled_y = self.to_window_coordinates(pin.x, pin.y)
@@ -202,75 +372,58 @@ class PCBWidget(Gtk.DrawingArea):
         ctx.arc(scaled_x, scaled_y, HIGHLIGHT_RADIUS, 0, 2*math.pi)
         ctx.set_source_rgba(1.0, 0, 0, 1.0)
         ctx.fill()
+        ctx.restore()
 
-        rect = Gdk.Rectangle()
-        rect.x = scaled_x - (HIGHLIGHT_RADIUS + 0.5)
-        rect.y = scaled_y - (HIGHLIGHT_RADIUS + 0.5)
-        rect.width = (HIGHLIGHT_RADIUS + 0.5) * 2
-        rect.height = (HIGHLIGHT_RADIUS + 0.5) * 2
+        self.highlighted_pin = pin
+        self.highlighted_net = self.pin_manager.net_id(pin.node)
+        self.highlight_extents = highlight.extents
 
-        self.get_window().invalidate_rect(rect, False)
-        self.highlighted_pins.append(pin)
+        self.invalidate_area(*highlight.extents)
 
-    def unhighlight_pin(self, pin):
-        ctx = cairo.Context(self.highlight_surface)
+    def unhighlight_pin(self):
+        if self.highlighted_pin is None:
+            return
 
-        # Convert x and y to window coordinates
-        scaled_x, scaled_y = self.to_window_coordinates(pin.x, pin.y)
+        ctx = self.highlight_ctx
+        ctx.save()
 
-        ctx.arc(scaled_x, scaled_y, HIGHLIGHT_RADIUS+0.5, 0, 2*math.pi)
+        ctx.rectangle(*self.highlight_extents)
         ctx.set_operator(cairo.OPERATOR_CLEAR)
-        ctx.set_source_rgba(1, 1, 1, 1)
         ctx.fill()
+        ctx.restore()
 
-        rect = Gdk.Rectangle()
-        rect.x = scaled_x - (HIGHLIGHT_RADIUS + 0.5)
-        rect.y = scaled_y - (HIGHLIGHT_RADIUS + 0.5)
-        rect.width = (HIGHLIGHT_RADIUS + 0.5) * 2
-        rect.height = (HIGHLIGHT_RADIUS + 0.5) * 2
+        self.invalidate_area(*self.highlight_extents)
 
-        self.get_window().invalidate_rect(rect, False)
+        self.highlighted_pin = None
+        self.highlighted_net = None
+        self.highlight_extents = None
 
     def start_draw_wire(self, pin, event):
         self.new_wire_start = pin
 
-    def invalidate_new_wire(self, event):
-        scaled_x, scaled_y = self.to_svg_coordinates(event.x, event.y)
-
-        # Determine minimum point and maximum point
-        min_x = min(scaled_x, self.new_wire_start.x)
-        min_y = min(scaled_y, self.new_wire_start.y)
-
-        max_x = max(scaled_x, self.new_wire_start.x)
-        max_y = max(scaled_y, self.new_wire_start.y)
-
-        scaled_min_x, scaled_min_y = self.to_window_coordinates(min_x, min_y)
-        scaled_max_x, scaled_max_y = self.to_window_coordinates(max_x, max_y)
-
-        update_rect = Gdk.Rectangle()
-        update_rect.x = scaled_min_x - 50
-        update_rect.y = scaled_min_y - 50
-        update_rect.width = (scaled_max_x - scaled_min_x) + 100
-        update_rect.height = (scaled_max_y - scaled_min_y) + 100
-
-        # paint to the surface where we store our state
-        cairo_ctx = cairo.Context(self.new_wire_surface)
+    def clear_new_wire(self):
+        """
+            Erases the preview of the wire being drawn. Only the area it
+            covered is cleared, however far the pointer moved since.
+        """
 
-        # Clear previous contents
-        cairo_ctx.set_source_rgba(1, 1, 1, 1)
-        cairo_ctx.set_operator(cairo.OPERATOR_CLEAR)
+        if self.new_wire_extents is None:
+            return
 
-        Gdk.cairo_rectangle(cairo_ctx, update_rect)
-        cairo_ctx.fill()
+        ctx = cairo.Context(self.new_wire_surface)
+        ctx.rectangle(*self.new_wire_extents)
+        ctx.set_operator(cairo.OPERATOR_CLEAR)
+        ctx.fill()
 
-        self.get_window().invalidate_rect(update_rect, False)
+        self.invalidate_area(*self.new_wire_extents)
+        self.new_wire_extents = None
 
     def update_new_wire(self, event):
         if not self.new_wire_start:
             return
 
         if event.state & Gdk.ModifierType.BUTTON1_MASK:
-            self.invalidate_new_wire(event)
+            self.clear_new_wire()
             self.draw_new_wire(event)
 
     def draw_new_wire(self, event):
@@ -278,133 +431,516 @@ class PCBWidget(Gtk.DrawingArea):
             return
 
         scaled_x, scaled_y = self.to_svg_coordinates(event.x, event.y)
-        self.draw_wire(self.new_wire_start.as_vector(), Vec2d(scaled_x, scaled_y),
-            self.new_wire_surface, color=0xFF9900)
+        x1, y1, x2, y2 = self.draw_wire(self.new_wire_start,
+            Vec2d(scaled_x, scaled_y), self.new_wire_surface, color=0xFF9900)
 
-    def draw_wire(self, vec1, vec2, surface, color=0x0066FF):
-        ctx = cairo.Context(surface)
-
-        scaled_x1, scaled_y1 = self.to_window_coordinates(vec1.x, vec1.y)
-        scaled_x2, scaled_y2 = self.to_window_coordinates(vec2.x, vec2.y)
+        # An extra pixel on each side for antialiasing
+        left = math.floor(x1) - 1
+        top = math.floor(y1) - 1
+        self.new_wire_extents = (left, top, math.ceil(x2) + 1 - left,
+            math.ceil(y2) + 1 - top)
 
-        v1 = Vec2d(scaled_x1, scaled_y1)
-        v2 = Vec2d(scaled_x2, scaled_y2)
+        self.invalidate_area(*self.new_wire_extents)
 
-        # Move to starting point
-        ctx.move_to(scaled_x1, scaled_y1)
+    def draw_wire(self, vec1, vec2, surface, color=0x0066FF, ctx=None):
+        """
+            Draws a curved wire between two points given in SVG coordinates.
 
-        # Vector point from start to end, which is the direction vector
-        v = (v2 - v1)
-        v_norm = v.normalized()
+            Returns the extents of the stroke in window coordinates.
+        """
 
-        # Traverse the vector a bit for a good position of the first
-        # control point of the curve
-        contr1_start = v1 + (v_norm * (v.length / 4))
-        contr1_perp = contr1_start.perpendicular().normalized()
-        contr1_point = contr1_start + (contr1_perp * (v.length / 4))
+        if ctx is None:
+            ctx = cairo.Context(surface)
 
-        # The same, but then for the other side
-        contr2_start = v2 - (v_norm * ((v.length) / 4))
-        contr2_perp = -contr2_start.perpendicular().normalized()
-        contr2_point = contr2_start + (contr2_perp * (v.length / 4))
+        x1, y1 = self.to_window_coordinates(vec1.x, vec1.y)
+        x2, y2 = self.to_window_coordinates(vec2.x, vec2.y)
+        c1x, c1y, c2x, c2y = control_points(x1, y1, x2, y2)
 
-        ctx.curve_to(contr1_point.x, contr1_point.y, contr2_point.x, contr2_point.y,
-            v2.x, v2.y)
+        ctx.move_to(x1, y1)
+        ctx.curve_to(c1x, c1y, c2x, c2y, x2, y2)
 
-        ctx.set_source_rgb((color >> 16)/255, ((color & 0xFF00) >> 8)/255,
-            (color & 0xFF)/255)
-        ctx.set_line_width(5)
+        ctx.set_source_rgb(*hex_to_rgb(color))
+        ctx.set_line_width(WIRE_WIDTH)
+        extents = ctx.stroke_extents()
         ctx.stroke()
 
-    def draw_connections(self):
+        return extents
+
+    def wire_color(self, connection):
+        pin1, pin2 = connection.pin1, connection.pin2
+
+        if pin1.node == 'GND' or pin2.node == 'GND':
+            return 0x0066FF
+        elif pin1.node == 'VCC' or pin2.node == 'VCC':
+            return 0xFF0000
+
+        return 0xFFDD55
+
+    def wire_ends(self, connections):
+        """
+            Returns lists with the window coordinates of both ends of the
+            given connections, ``(x1, y1, x2, y2)``.
+        """
+
+        pins1 = [connection.pin1 for connection in connections]
+        pins2 = [connection.pin2 for connection in connections]
+
+        scale = self.viewport.scale
+        dx, dy = self.viewport.offset_x, self.viewport.offset_y
+
+        return ([pin.x * scale + dx for pin in pins1],
+            [pin.y * scale + dy for pin in pins1],
+            [pin.x * scale + dx for pin in pins2],
+            [pin.y * scale + dy for pin in pins2])
+
+    def stroke_connections(self, connections, ctx=None, simplified=False):
+        """
+            Draws connections on the wire surface, and remembers the area
+            each of them covers.
+
+            The geometry of all wires is computed in one go from flat
+            coordinate lists, and fed to cairo directly.
+
+            Wires shorter than LOD_MIN_LENGTH pixels, or all wires when
+            simplified is set, are drawn as straight lines. These are
+            batched in a single path and stroke per colour.
+        """
+
+        if ctx is None:
+            ctx = cairo.Context(self.wire_surface)
+
+        x1, y1, x2, y2 = self.wire_ends(connections)
+
+        # Extra pixel of margin for antialiasing
+        geometry = wire_geometry(x1, y1, x2, y2, WIRE_WIDTH / 2 + 1)
+
+        ctx.set_line_width(WIRE_WIDTH)
+
+        min_length_sqrd = LOD_MIN_LENGTH**2
+        curves = []
+        lines = {}
+
+        for i, connection in enumerate(connections):
+            self.wire_extents.insert(connection.id, (geometry.rect_x[i],
+                geometry.rect_y[i], geometry.rect_width[i],
+                geometry.rect_height[i]))
+
+            color = self.wire_color(connection)
+            if simplified or ((x2[i] - x1[i])**2 +
+                    (y2[i] - y1[i])**2 < min_length_sqrd):
+                lines.setdefault(color, []).append(i)
+            else:
+                curves.append((i, color))
+
+        for color, indices in lines.items():
+            for i in indices:
+                ctx.move_to(x1[i], y1[i])
+                ctx.line_to(x2[i], y2[i])
+
+            ctx.set_source_rgb(*hex_to_rgb(color))
+            ctx.stroke()
+
+        for i, color in curves:
+            ctx.move_to(x1[i], y1[i])
+            ctx.curve_to(geometry.c1x[i], geometry.c1y[i], geometry.c2x[i],
+                geometry.c2y[i], x2[i], y2[i])
+            ctx.set_source_rgb(*hex_to_rgb(color))
+            ctx.stroke()
+
+        return geometry
+
+    def draw_connections(self, detailed=False):
+        """
+            Redraws all connections on a fresh wire surface.
+
+            On boards with more than LOD_WIRE_COUNT wires, the wires are
+            first drawn as straight lines to keep the widget responsive. The
+            full curves are drawn once nothing has changed for RENDER_DELAY
+            milliseconds.
+        """
+
+        if self.detail_timeout is not None:
+            GLib.source_remove(self.detail_timeout)
+            self.detail_timeout = None
+
         self.create_wire_surface()
+        self.wire_extents.clear()
+
+        connections = list(self.pin_manager.connections)
+        simplified = not detailed and len(connections) > LOD_WIRE_COUNT
 
-        for connection in self.pin_manager.connections:
-            color = 0xFFDD55
-            if connection[0].node == 'GND' or connection[1].node == 'GND':
-                color = 0x0066FF
-            elif connection[0].node == 'VCC' or connection[1].node == 'VCC':
-                color = 0xFF0000
+        self.stroke_connections(connections, simplified=simplified)
 
-            self.draw_wire(connection[0], connection[1], self.wire_surface, color)
+        if simplified:
+            self.detail_timeout = GLib.timeout_add(RENDER_DELAY,
+                self.on_detail_timeout)
 
+        self.composite_damage = None
         self.queue_draw()
 
+    def on_detail_timeout(self):
+        self.detail_timeout = None
+        self.draw_connections(detailed=True)
+
+        return False
+
+    def on_connection_change(self, pin_manager, change):
+        """
+            Update the wire surface for a change of the connections. Small
+            changes only redraw the area of the changed wires, large batches
+            redraw everything at once.
+
+            Cached net highlights of the changed nets are dropped, and the
+            highlight of the hovered net is drawn again when it changed.
+        """
+
+        for root in change.roots:
+            self.net_highlights.pop(root, None)
+
+        if self.surface is None:
+            # Not shown yet, all wires are drawn on the first render
+            return
+
+        if self.highlighted_net in change.roots:
+            pin = self.highlighted_pin
+            self.unhighlight_pin()
+            self.highlight_pin(pin)
+
+        if not self.layers_current():
+            # Everything is drawn again for the current viewport
+            self.render_background()
+        elif len(change.added) + len(change.removed) > REDRAW_WIRE_COUNT:
+            self.draw_connections()
+        else:
+            if change.removed:
+                self.remove_wires(change.removed.values())
+
+            for connection in change.added.values():
+                self.add_wire(connection)
+
+    def add_wire(self, connection):
+        """
+            Draws a new connection on top of the existing wire surface, only
+            the area of the new wire gets redrawn.
+        """
+
+        if not self.layers_current():
+            # The wire surface is still drawn for an old viewport, render
+            # everything for the current viewport instead
+            self.render_background()
+            return
+
+        geometry = self.stroke_connections([connection])
+        rect = (geometry.rect_x[0], geometry.rect_y[0],
+            geometry.rect_width[0], geometry.rect_height[0])
+
+        self.damage_composite(cairo.Region(cairo.RectangleInt(*rect)))
+        self.invalidate_area(*rect)
+
+    def remove_wires(self, connections):
+        """
+            Erases the given connections from the wire surface. Only the area
+            covered by these wires is cleared, and the remaining wires
+            crossing that area are drawn again.
+        """
+
+        if not self.layers_current():
+            self.render_background()
+            return
+
+        region = cairo.Region()
+        for connection in connections:
+            if connection.id in self.wire_extents:
+                region.union(cairo.RectangleInt(
+                    *self.wire_extents.remove(connection.id)))
+
+        if region.is_empty():
+            return
+
+        ctx = cairo.Context(self.wire_surface)
+
+        damaged = set()
+        for i in range(region.num_rectangles()):
+            rect = region.get_rectangle(i)
+            ctx.rectangle(rect.x, rect.y, rect.width, rect.height)
+
+            damaged.update(self.wire_extents.query(
+                (rect.x, rect.y, rect.width, rect.height)))
+
+        ctx.clip()
+        ctx.set_operator(cairo.OPERATOR_CLEAR)
+        ctx.paint()
+        ctx.set_operator(cairo.OPERATOR_OVER)
+
+        # Connection ids are increasing, so sorting them keeps the original
+        # drawing order
+        connections = self.pin_manager.connections
+        self.stroke_connections(
+            [connections[connection_id] for connection_id in sorted(damaged)],
+            ctx)
+
+        self.damage_composite(region)
+        self.get_window().invalidate_region(region, False)
+
+    def damage_composite(self, region):
+        if self.composite_damage is not None:
+            self.composite_damage.union(region)
+
+    def update_composite(self):
+        """
+            Blend the background and wire layers into the composite surface,
+            for the parts which changed since the last draw.
+        """
+
+        if self.composite_size != self.wire_layer_size:
+            self.composite_surface = self.get_window().create_similar_surface(
+                cairo.CONTENT_COLOR, *self.wire_layer_size)
+            self.composite_size = self.wire_layer_size
+            self.composite_damage = None
+
+        ctx = cairo.Context(self.composite_surface)
+
+        if self.composite_damage is not None:
+            if self.composite_damage.is_empty():
+                return
+
+            for i in range(self.composite_damage.num_rectangles()):
+                rect = self.composite_damage.get_rectangle(i)
+                ctx.rectangle(rect.x, rect.y, rect.width, rect.height)
+
+            ctx.clip()
+
+        ctx.set_source_rgb(*BACKGROUND_COLOR)
+        ctx.paint()
+
+        ctx.set_source_surface(self.surface, 0, 0)
+        ctx.paint()
+
+        ctx.set_source_surface(self.wire_surface, 0, 0)
+        ctx.paint()
+
+        self.composite_damage = cairo.Region()
+
+    def invalidate_area(self, x, y, width, height):
+        rect = Gdk.Rectangle()
+        rect.x = x
+        rect.y = y
+        rect.width = width
+        rect.height = height
+
+        self.get_window().invalidate_rect(rect, False)
+
     def on_configure(self, widget, event):
         """
-            Initialise our surface where the actual drawing happens.
+            Initialise our surfaces where the actual drawing happens.
 
-            When the draw event happens, we paint this surface to the actual
+            When the draw event happens, we paint these surfaces to the actual
             widget.
 
-            We have separate surfaces for highlighting pins, new wires, and
-            existing connections.
+            We have separate surfaces for the PCB background, highlighting
+            pins, new wires, and existing connections.
+
+            Rendering the SVG is expensive, so while the widget is being
+            resized we keep showing the previous background scaled to the new
+            size. The exact render happens on a worker thread once the size
+            has settled.
 
             .. seealso PCBWidget.on_draw
         """
 
         allocation = self.get_allocation()
 
-        # Create a surface where we will draw our PCB SVG
-        self.surface = self.get_window().create_similar_surface(cairo.CONTENT_COLOR,
-            allocation.width, allocation.height)
+        # Scale our svg to the widget size, keeping the zoom level
+        self.viewport.resize(allocation.width, allocation.height)
+
+        layer_size = (
+            math.ceil(allocation.width / LAYER_GRANULARITY) * LAYER_GRANULARITY,
+            math.ceil(allocation.height / LAYER_GRANULARITY) * LAYER_GRANULARITY
+        )
+
+        # The wire surface is kept until the wires are drawn again, so it can
+        # be shown stretched in the meantime
+        if layer_size != self.layer_size:
+            self.layer_size = layer_size
+            self.new_wire_surface = None
+            self.highlight_surface = None
+
+        self.create_highlight_surface()
+        self.create_new_wire_surface()
+        self.update_view()
+
+        return True
+
+    def update_view(self):
+        """
+            Show the board for the current viewport. When all background
+            tiles are cached this happens right away, otherwise the current
+            layers are shown transformed to the new viewport until it has
+            settled and the missing tiles are rendered.
+        """
+
+        if self.surface is None or not self.missing_tiles():
+            self.render_background()
+        else:
+            self.schedule_render()
+            self.queue_draw()
+
+    def missing_tiles(self):
+        scale = self.viewport.scale
+
+        return [tile for tile in self.viewport.visible_tiles(TILE_SIZE)
+            if (scale,) + tile not in self.tile_cache]
 
-        # Scale our svg to the widget size
-        ratio_x = allocation.width / self.pin_manager.svg_handle.props.width
-        ratio_y = allocation.height / self.pin_manager.svg_handle.props.height
+    def schedule_render(self):
+        if self.render_timeout is not None:
+            GLib.source_remove(self.render_timeout)
 
-        self.scale = min(ratio_x, ratio_y)
+        # Tiles for an older viewport are not needed anymore
+        self.tile_renderer.cancel()
+        self.render_timeout = GLib.timeout_add(RENDER_DELAY,
+            self.request_tiles)
+
+    def request_tiles(self):
+        """
+            Start rendering the missing tiles for the current viewport on the
+            worker thread. The background is assembled once they are in.
+        """
+
+        self.render_timeout = None
+
+        missing = self.missing_tiles()
+        if missing:
+            self.tile_renderer.render(self.viewport.scale, missing,
+                self.on_tiles_rendered)
+        else:
+            self.render_background()
+
+        return False
+
+    def on_tiles_rendered(self, scale, rendered):
+        for tile, surface in rendered.items():
+            self.tile_cache.put((scale,) + tile, surface)
+
+        if scale != self.viewport.scale:
+            return False
+
+        if self.layers_current():
+            # Fill in the placeholders of the background being shown
+            region = self.paint_tiles(rendered)
+            self.damage_composite(region)
+            self.get_window().invalidate_region(region, False)
+        elif not self.missing_tiles():
+            self.render_background()
+
+        return False
+
+    def render_background(self):
+        """
+            Assemble the background for the current viewport from the cached
+            tiles, and redraw the wires to match.
+
+            Tiles which are not in the cache yet are left as plain background
+            colour, and are requested from the worker thread.
+        """
+
+        if self.render_timeout is not None:
+            GLib.source_remove(self.render_timeout)
+            self.render_timeout = None
+
+        if self.layer_state is None or self.background_size != self.layer_size:
+            self.surface = self.get_window().create_similar_surface(
+                cairo.CONTENT_COLOR, *self.layer_size)
+            self.background_size = self.layer_size
 
         ctx = cairo.Context(self.surface)
-        ctx.scale(self.scale, self.scale)
-        ctx.set_source_rgb(1/255, 146/255, 62/255)
+        ctx.set_source_rgb(*BACKGROUND_COLOR)
         ctx.paint()
-        self.pin_manager.svg_handle.render_cairo(ctx)
 
-        self.create_highlight_surface()
-        self.create_new_wire_surface()
+        scale = self.viewport.scale
+        tiles = {}
+        for tile in self.viewport.visible_tiles(TILE_SIZE):
+            surface = self.tile_cache.get((scale,) + tile)
+            if surface is not None:
+                tiles[tile] = surface
+
+        self.paint_tiles(tiles)
+
+        self.layer_state = self.viewport.state
         self.draw_connections()
 
-        return True
+        if len(tiles) != len(self.viewport.visible_tiles(TILE_SIZE)):
+            self.request_tiles()
 
-    def create_highlight_surface(self):
+        return False
+
+    def paint_tiles(self, tiles):
         """
-            A surface where we draw pin highlights.
+            Paint tiles at the current scale on the background surface.
 
-            Gets completely redrawn on window resize.
-            Gets partially redrawn when the user moves the mouse.
+            Returns the region of the window they cover.
         """
 
-        allocation = self.get_allocation()
+        viewport = self.viewport
+        ctx = cairo.Context(self.surface)
+        region = cairo.Region()
 
-        # Create a separate surface for highlighting areas
-        self.highlight_surface = self.get_window().create_similar_surface(
-            cairo.CONTENT_COLOR_ALPHA, allocation.width, allocation.height)
+        for (tx, ty), surface in tiles.items():
+            x = int(tx * TILE_SIZE + viewport.offset_x)
+            y = int(ty * TILE_SIZE + viewport.offset_y)
 
-        highlight_ctx = cairo.Context(self.highlight_surface)
+            ctx.set_source_surface(surface, x, y)
+            ctx.rectangle(x, y, TILE_SIZE, TILE_SIZE)
+            ctx.fill()
 
-        # Make sure it is completely transparent
-        highlight_ctx.set_source_rgba(1, 1, 1, 0)
-        highlight_ctx.set_operator(cairo.OPERATOR_SOURCE)
-        highlight_ctx.paint()
+            region.union(cairo.RectangleInt(x, y, TILE_SIZE, TILE_SIZE))
+
+        return region
+
+    def create_layer(self, surface):
+        """
+            Returns a completely transparent surface of the current layer
+            size. The given surface is cleared and reused if there is one.
+        """
+
+        if surface is None:
+            surface = self.get_window().create_similar_surface(
+                cairo.CONTENT_COLOR_ALPHA, *self.layer_size)
+
+        ctx = cairo.Context(surface)
+        ctx.set_source_rgba(1, 1, 1, 0)
+        ctx.set_operator(cairo.OPERATOR_SOURCE)
+        ctx.paint()
+
+        return surface
+
+    def create_highlight_surface(self):
+        """
+            A surface where we draw pin and net highlights.
+
+            Gets completely cleared on window resize.
+            Gets partially redrawn when the user moves the mouse.
+        """
+
+        self.highlight_surface = self.create_layer(self.highlight_surface)
+        self.highlight_ctx = cairo.Context(self.highlight_surface)
+        self.highlighted_pin = None
+        self.highlighted_net = None
+        self.highlight_extents = None
 
     def create_wire_surface(self):
         """
             The surface where all connections between pins are drawn.
 
-            This surface is completely redrawn every time a new connection
-            is made.
+            This surface is completely redrawn when the background is
+            rendered at a new scale. New and removed connections only redraw
+            the area they cover.
         """
-        allocation = self.get_allocation()
 
-        # And another surface for the wires
-        self.wire_surface = self.get_window().create_similar_surface(
-            cairo.CONTENT_COLOR_ALPHA, allocation.width, allocation.height)
+        if self.wire_layer_size != self.layer_size:
+            self.wire_surface = None
+            self.wire_layer_size = self.layer_size
 
-        wire_ctx = cairo.Context(self.wire_surface)
-        wire_ctx.set_source_rgba(1, 1, 1, 0)
-        wire_ctx.set_operator(cairo.OPERATOR_SOURCE)
-        wire_ctx.paint()
+        self.wire_surface = self.create_layer(self.wire_surface)
 
     def create_new_wire_surface(self):
         """
@@ -413,64 +949,108 @@ class PCBWidget(Gtk.DrawingArea):
 
             It only gets partially redrawn when the user moves the mouse.
         """
-        allocation = self.get_allocation()
-
-        # And another surface for the wires
-        self.new_wire_surface = self.get_window().create_similar_surface(
-            cairo.CONTENT_COLOR_ALPHA, allocation.width, allocation.height)
 
-        wire_ctx = cairo.Context(self.new_wire_surface)
-        wire_ctx.set_source_rgba(1, 1, 1, 0)
-        wire_ctx.set_operator(cairo.OPERATOR_SOURCE)
-        wire_ctx.paint()
+        self.new_wire_surface = self.create_layer(self.new_wire_surface)
+        self.new_wire_extents = None
 
     def on_motion_notify(self, widget, event):
+        # Pointer events can arrive much faster than we can draw, only keep
+        # the latest position and handle it on the next frame
+        self.pending_motion = PointerState(event.x, event.y, event.state)
+
+        if self.motion_tick_id is None:
+            self.motion_tick_id = self.add_tick_callback(self.on_motion_tick)
+
+    def on_motion_tick(self, widget, frame_clock):
+        self.motion_tick_id = None
+        self.flush_motion()
+
+        return GLib.SOURCE_REMOVE
+
+    def flush_motion(self):
+        if self.pending_motion is None:
+            return
+
+        event = self.pending_motion
+        self.pending_motion = None
+
+        if self.pan_position and event.state & Gdk.ModifierType.BUTTON2_MASK:
+            self.viewport.pan(event.x - self.pan_position[0],
+                event.y - self.pan_position[1])
+            self.pan_position = (event.x, event.y)
+            self.view_changed()
+            return
+
         # Convert mouse x and y to coordinates relative to the original SVG size
         scaled_x, scaled_y = self.to_svg_coordinates(event.x, event.y)
 
-        # Find the nearest pins close to the mouse
-        nearest_pin = self.pin_manager.nearest_pin((scaled_x, scaled_y))
-        if nearest_pin:
-            dist = math.sqrt((nearest_pin.x - scaled_x)**2 +
-                (nearest_pin.y - scaled_y)**2)
+        # Find the pin close to the mouse
+        hit = self.pin_manager.pin_within((scaled_x, scaled_y), PIN_HIT_RADIUS)
+        nearest_pin = hit[0] if hit else None
 
-            while self.highlighted_pins:
-                pin = self.highlighted_pins.pop()
-                self.unhighlight_pin(pin)
+        # Nothing to do for the highlights if we're still on the same pin
+        if nearest_pin is not self.highlighted_pin:
+            self.unhighlight_pin()
 
-            if dist <= 5:
-                if nearest_pin not in self.highlighted_pins:
-                    self.highlight_pin(nearest_pin)
+            if nearest_pin:
+                self.highlight_pin(nearest_pin)
 
-                if event.state & Gdk.ModifierType.BUTTON1_MASK:
-                    # Button pressed
-                    if not self.new_wire_start:
-                        self.start_draw_wire(nearest_pin, event)
+        if nearest_pin and event.state & Gdk.ModifierType.BUTTON1_MASK:
+            # Button pressed
+            if not self.new_wire_start:
+                self.start_draw_wire(nearest_pin, event)
 
         self.update_new_wire(event)
 
+    def view_changed(self):
+        # Highlights are drawn in window coordinates, so they don't match the
+        # new viewport anymore
+        if self.highlighted_pin is not None:
+            self.create_highlight_surface()
+
+        self.update_view()
+
+    def on_scroll(self, widget, event):
+        if event.direction == Gdk.ScrollDirection.UP:
+            factor = ZOOM_STEP
+        elif event.direction == Gdk.ScrollDirection.DOWN:
+            factor = 1 / ZOOM_STEP
+        else:
+            return False
+
+        self.viewport.zoom_at(factor, event.x, event.y)
+        self.view_changed()
+
+        return True
+
+    def on_button_press(self, widget, event):
+        if event.button == 2:
+            self.pan_position = (event.x, event.y)
+
     def on_button_release(self, widget, event):
-        svg_x, svg_y = self.to_svg_coordinates(event.x, event.y)
-        nearest_pin = self.pin_manager.nearest_pin((svg_x, svg_y))
-        dist = 0
+        # Handle outstanding motion first, so the release is handled in the
+        # state the user has seen
+        self.flush_motion()
 
-        if nearest_pin:
-            dist = math.sqrt((nearest_pin.x - svg_x)**2 +
-                (nearest_pin.y - svg_y)**2)
+        if event.button == 2:
+            self.pan_position = None
+            return
+
+        svg_x, svg_y = self.to_svg_coordinates(event.x, event.y)
+        hit = self.pin_manager.pin_within((svg_x, svg_y), PIN_HIT_RADIUS)
+        nearest_pin = hit[0] if hit else None
 
         if self.new_wire_start:
             # Check if we need to make a new connection
             if nearest_pin and nearest_pin is not self.new_wire_start:
-                if dist <= 5:
-                    self.pin_manager.add_connection(self.new_wire_start, nearest_pin)
-                    self.draw_connections()
+                self.pin_manager.add_connection(self.new_wire_start,
+                    nearest_pin)
 
-            self.invalidate_new_wire(event)
+            self.clear_new_wire()
 
         if event.state & Gdk.ModifierType.BUTTON3_MASK:
-            if nearest_pin and dist <= 5:
+            if nearest_pin:
                 self.pin_manager.remove_connections(nearest_pin)
-                self.draw_connections()
 
         self.new_wire_start = None
 
@@ -478,21 +1058,34 @@ class PCBWidget(Gtk.DrawingArea):
         if not self.surface:
             return False
 
-        ctx.set_source_surface(self.surface, 0, 0)
-        ctx.paint()
+        self.update_composite()
 
-        if self.wire_surface:
-            ctx.set_source_surface(self.wire_surface, 0, 0)
+        # While resizing, zooming or panning, the background and wires are
+        # transformed to the new viewport until they are drawn again
+        if not self.layers_current():
+            ctx.set_source_rgb(*BACKGROUND_COLOR)
             ctx.paint()
 
-        if self.new_wire_surface:
+            factor, dx, dy = self.viewport.transform_from(self.layer_state)
+
+            ctx.save()
+            ctx.translate(dx, dy)
+            ctx.scale(factor, factor)
+            ctx.set_source_surface(self.composite_surface, 0, 0)
+            ctx.paint()
+            ctx.restore()
+        else:
+            ctx.set_source_surface(self.composite_surface, 0, 0)
+            ctx.paint()
+
+        # These layers are empty when the user is not drawing a wire or
+        # hovering a pin
+        if self.new_wire_start:
             ctx.set_source_surface(self.new_wire_surface, 0, 0)
             ctx.paint()
 
-        if self.highlight_surface:
+        if self.highlighted_pin is not None:
             ctx.set_source_surface(self.highlight_surface, 0, 0)
             ctx.paint()
 
         return False
-
-
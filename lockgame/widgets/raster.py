@@ -0,0 +1,121 @@
+import queue
+import threading
+from collections import OrderedDict
+
+from gi.repository import GLib
+import cairo
+
+
+class RasterCache:
+    """
+        Least recently used cache of rendered background tiles, keyed by the
+        scale they were rendered at and their position.
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        surface = self.entries.get(key)
+
+        if surface is not None:
+            self.entries.move_to_end(key)
+
+        return surface
+
+    def put(self, key, surface):
+        self.entries[key] = surface
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class TileRenderer:
+    """
+        Renders background tiles of an SVG on a worker thread, so the GTK
+        main loop keeps running while a heavy SVG is rasterized.
+
+        Tiles are rendered to image surfaces, and handed back to the main
+        loop with GLib.idle_add. Each request replaces the previous one:
+        a request which hasn't finished yet stops after the tile it is
+        working on. The SVG document is parsed on the worker thread as well,
+        if that didn't happen yet.
+    """
+
+    def __init__(self, document, tile_size, background_color):
+        self.document = document
+        self.tile_size = tile_size
+        self.background_color = background_color
+
+        # Incremented for every request, the worker drops anything which
+        # doesn't belong to the latest one
+        self.generation = 0
+        self.requests = queue.Queue()
+        self.thread = None
+
+    def render(self, scale, tiles, callback):
+        """
+            Render the given ``(tx, ty)`` tiles at scale. Once done,
+            ``callback(scale, rendered)`` is called from the main loop, with
+            rendered a dict from tile to surface. When the request is
+            cancelled, callback gets the tiles which were finished.
+        """
+
+        self.generation += 1
+        self.requests.put((self.generation, scale, list(tiles), callback))
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def cancel(self):
+        self.generation += 1
+
+    def run(self):
+        while True:
+            generation, scale, tiles, callback = self.requests.get()
+
+            rendered = {}
+            for tile in tiles:
+                if generation != self.generation:
+                    break
+
+                rendered[tile] = self.render_tile(scale, *tile)
+
+            # Finished tiles are valid for their scale, even when the request
+            # was cancelled
+            if rendered:
+                GLib.idle_add(callback, scale, rendered)
+
+    def render_tile(self, scale, tx, ty):
+        """
+            Render a single tile of the SVG at the given scale to a new
+            surface. Everything outside of the tile is clipped, so cairo only
+            rasterizes the part of the SVG within it.
+        """
+
+        size = self.tile_size
+        surface = cairo.ImageSurface(cairo.FORMAT_RGB24, size, size)
+
+        ctx = cairo.Context(surface)
+        ctx.set_source_rgb(*self.background_color)
+        ctx.paint()
+
+        ctx.translate(-tx * size, -ty * size)
+        ctx.scale(scale, scale)
+        self.document.handle.render_cairo(ctx)
+
+        surface.flush()
+
+        return surface
@@ -0,0 +1,119 @@
+MIN_ZOOM = 1.0
+MAX_ZOOM = 16.0
+
+
+class Viewport:
+    """
+        The mapping between SVG coordinates and window coordinates.
+
+        The transform is a scale followed by an offset:
+
+            window = svg * scale + offset
+
+        The scale is the zoom level times the scale at which the whole SVG
+        fits the window. The transform is only updated when the window size,
+        zoom or pan changes, so converting coordinates doesn't have to look at
+        the widget allocation.
+    """
+
+    def __init__(self, svg_width, svg_height):
+        self.svg_width = svg_width
+        self.svg_height = svg_height
+
+        self.width = 1
+        self.height = 1
+
+        self.fit_scale = 1.0
+        self.zoom = 1.0
+        self.scale = 1.0
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+
+    @property
+    def state(self):
+        """
+            Hashable snapshot of the transform, to check whether something
+            drawn earlier is still valid.
+        """
+
+        return (self.scale, self.offset_x, self.offset_y)
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+
+        self.fit_scale = min(width / self.svg_width, height / self.svg_height)
+        self.update()
+
+    def update(self):
+        self.scale = self.fit_scale * self.zoom
+
+        # Don't allow panning the board out of view, when zoomed out
+        # completely this keeps the board in the top left corner like before
+        min_x = min(0.0, self.width - self.svg_width * self.scale)
+        min_y = min(0.0, self.height - self.svg_height * self.scale)
+
+        # Whole pixel offsets keep the background tiles sharp
+        self.offset_x = round(max(min_x, min(0.0, self.offset_x)))
+        self.offset_y = round(max(min_y, min(0.0, self.offset_y)))
+
+    def zoom_at(self, factor, x, y):
+        """
+            Multiply the zoom level by factor, keeping the point at window
+            coordinates (x, y) in place.
+        """
+
+        svg_x, svg_y = self.to_svg(x, y)
+
+        # Rounded, so zooming in and out again ends up at exactly the same
+        # scale and finds its tiles in the cache
+        zoom = max(MIN_ZOOM, min(MAX_ZOOM, self.zoom * factor))
+        self.zoom = round(zoom, 6)
+        self.scale = self.fit_scale * self.zoom
+        self.offset_x = x - svg_x * self.scale
+        self.offset_y = y - svg_y * self.scale
+
+        self.update()
+
+    def pan(self, dx, dy):
+        self.offset_x += dx
+        self.offset_y += dy
+
+        self.update()
+
+    def to_window(self, x, y):
+        return x * self.scale + self.offset_x, y * self.scale + self.offset_y
+
+    def to_svg(self, x, y):
+        return (x - self.offset_x) / self.scale, (y - self.offset_y) / self.scale
+
+    def transform_from(self, state):
+        """
+            Returns ``(factor, dx, dy)`` which maps window coordinates drawn
+            with an earlier state of this viewport to the current window
+            coordinates: ``new = old * factor + (dx, dy)``.
+        """
+
+        scale, offset_x, offset_y = state
+        factor = self.scale / scale
+
+        return (factor, self.offset_x - offset_x * factor,
+            self.offset_y - offset_y * factor)
+
+    def visible_tiles(self, tile_size):
+        """
+            The tiles, in the SVG scaled to the current scale, which cover
+            the window.
+        """
+
+        first_x = int(-self.offset_x // tile_size)
+        first_y = int(-self.offset_y // tile_size)
+        last_x = int((self.width - self.offset_x) // tile_size)
+        last_y = int((self.height - self.offset_y) // tile_size)
+
+        # No need to render tiles outside of the SVG
+        last_x = min(last_x, int(self.svg_width * self.scale // tile_size))
+        last_y = min(last_y, int(self.svg_height * self.scale // tile_size))
+
+        return [(tx, ty) for ty in range(max(0, first_y), last_y + 1)
+            for tx in range(max(0, first_x), last_x + 1)]
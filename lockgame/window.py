@@ -36,6 +36,8 @@ class MainWindow(Gtk.Window):
 
         self.add(self.stack)
 
+        self.connect('key-press-event', self.on_key_press)
+
     def init_style(self):
         style_provider = Gtk.CssProvider()
 
@@ -55,10 +57,36 @@ class MainWindow(Gtk.Window):
         self.stack.add_titled(self.shell_widget, "shell", "Shell")
 
     def init_pcb_view(self):
-        self.pcb = PCBWidget(self.game_manager.pin_manager)
+        pin_manager = self.game_manager.pin_manager
+
+        # Parse the PCB and its pins in the background, so the shell view
+        # shows up without waiting for it
+        pin_manager.document.preload()
+        self.game_manager.load_pins()
+        self.pcb = PCBWidget(pin_manager)
 
         self.stack.add_titled(self.pcb, "pcb", "PCB")
 
+    def on_key_press(self, widget, event):
+        # Ctrl+Z undoes a wiring edit, Ctrl+Shift+Z or Ctrl+Y redoes it
+        if (self.stack.get_visible_child() is not self.pcb or
+                not event.state & Gdk.ModifierType.CONTROL_MASK):
+            return False
+
+        pin_manager = self.game_manager.pin_manager
+        key = Gdk.keyval_to_lower(event.keyval)
+
+        if key == Gdk.KEY_z and event.state & Gdk.ModifierType.SHIFT_MASK:
+            pin_manager.redo()
+        elif key == Gdk.KEY_z:
+            pin_manager.undo()
+        elif key == Gdk.KEY_y:
+            pin_manager.redo()
+        else:
+            return False
+
+        return True
+
     def change_shell(self, sender, shell):
         self.shell_widget.clear_text()
         self.shell_widget.set_shell_manager(shell)
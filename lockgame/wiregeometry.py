@@ -0,0 +1,133 @@
+"""
+    Geometry of the curved wires between pins.
+
+    A wire is a cubic bezier curve from (x1, y1) to (x2, y2). Both control
+    points lie a quarter of the way along the wire, pushed sideways by a
+    quarter of the wire length. All functions work on flat sequences of
+    coordinates, so many wires can be computed at once.
+"""
+
+from collections import namedtuple
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+WireGeometry = namedtuple('WireGeometry', [
+    'c1x', 'c1y', 'c2x', 'c2y',
+    'rect_x', 'rect_y', 'rect_width', 'rect_height'
+])
+
+
+def control_points(x1, y1, x2, y2):
+    """
+        Returns the two control points ``(c1x, c1y, c2x, c2y)`` for a single
+        wire.
+    """
+
+    dx = x2 - x1
+    dy = y2 - y1
+    quarter = math.sqrt(dx * dx + dy * dy) / 4
+
+    # Start of the first control point, a quarter along the wire
+    s1x = x1 + dx / 4
+    s1y = y1 + dy / 4
+    s1_length = math.sqrt(s1x * s1x + s1y * s1y)
+
+    c1x = s1x
+    c1y = s1y
+    if s1_length:
+        c1x -= s1y / s1_length * quarter
+        c1y += s1x / s1_length * quarter
+
+    # The same, but then from the other end
+    s2x = x2 - dx / 4
+    s2y = y2 - dy / 4
+    s2_length = math.sqrt(s2x * s2x + s2y * s2y)
+
+    c2x = s2x
+    c2y = s2y
+    if s2_length:
+        c2x += s2y / s2_length * quarter
+        c2y -= s2x / s2_length * quarter
+
+    return c1x, c1y, c2x, c2y
+
+
+def wire_geometry(x1, y1, x2, y2, margin=0.0):
+    """
+        Computes the control points and bounding rectangles for many wires.
+
+        The bounding rectangles are in whole pixels, grown by margin on all
+        sides (for example half the line width). Uses NumPy when available.
+        Returns a WireGeometry of flat lists.
+    """
+
+    if numpy is not None:
+        return _wire_geometry_numpy(x1, y1, x2, y2, margin)
+
+    c1x, c1y, c2x, c2y = [], [], [], []
+    rect_x, rect_y, rect_width, rect_height = [], [], [], []
+
+    for ax, ay, bx, by in zip(x1, y1, x2, y2):
+        p1x, p1y, p2x, p2y = control_points(ax, ay, bx, by)
+        c1x.append(p1x)
+        c1y.append(p1y)
+        c2x.append(p2x)
+        c2y.append(p2y)
+
+        # A bezier curve always lies within the hull of its control points
+        left = math.floor(min(ax, p1x, p2x, bx) - margin)
+        top = math.floor(min(ay, p1y, p2y, by) - margin)
+        rect_x.append(left)
+        rect_y.append(top)
+        rect_width.append(math.ceil(max(ax, p1x, p2x, bx) + margin) - left)
+        rect_height.append(math.ceil(max(ay, p1y, p2y, by) + margin) - top)
+
+    return WireGeometry(c1x, c1y, c2x, c2y,
+        rect_x, rect_y, rect_width, rect_height)
+
+
+def _wire_geometry_numpy(x1, y1, x2, y2, margin):
+    x1 = numpy.asarray(x1, dtype=numpy.float64)
+    y1 = numpy.asarray(y1, dtype=numpy.float64)
+    x2 = numpy.asarray(x2, dtype=numpy.float64)
+    y2 = numpy.asarray(y2, dtype=numpy.float64)
+
+    dx = x2 - x1
+    dy = y2 - y1
+    quarter = numpy.hypot(dx, dy) / 4
+
+    s1x = x1 + dx / 4
+    s1y = y1 + dy / 4
+    s2x = x2 - dx / 4
+    s2y = y2 - dy / 4
+
+    # Scale factors for the sideways offsets, zero where the start point of
+    # the offset is the origin
+    s1_length = numpy.hypot(s1x, s1y)
+    s2_length = numpy.hypot(s2x, s2y)
+    f1 = numpy.divide(quarter, s1_length, out=numpy.zeros_like(quarter),
+        where=s1_length != 0)
+    f2 = numpy.divide(quarter, s2_length, out=numpy.zeros_like(quarter),
+        where=s2_length != 0)
+
+    c1x = s1x - s1y * f1
+    c1y = s1y + s1x * f1
+    c2x = s2x + s2y * f2
+    c2y = s2y - s2x * f2
+
+    left = numpy.floor(numpy.minimum(numpy.minimum(x1, x2),
+        numpy.minimum(c1x, c2x)) - margin)
+    top = numpy.floor(numpy.minimum(numpy.minimum(y1, y2),
+        numpy.minimum(c1y, c2y)) - margin)
+    right = numpy.ceil(numpy.maximum(numpy.maximum(x1, x2),
+        numpy.maximum(c1x, c2x)) + margin)
+    bottom = numpy.ceil(numpy.maximum(numpy.maximum(y1, y2),
+        numpy.maximum(c1y, c2y)) + margin)
+
+    return WireGeometry(c1x.tolist(), c1y.tolist(), c2x.tolist(),
+        c2y.tolist(), left.astype(int).tolist(), top.astype(int).tolist(),
+        (right - left).astype(int).tolist(), (bottom - top).astype(int).tolist())
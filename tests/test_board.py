@@ -0,0 +1,419 @@
+"""
+    Tests for the headless board: connectivity through edits, batches, undo
+    and redo, snapshots and rules. Connectivity is checked against a plain
+    search over the connections of the board.
+"""
+
+import operator
+import random
+import re
+
+import pytest
+
+from lockgame.board import Board, Journal, Pin, RuleSet, Snapshot
+from lockgame.board import pintable
+
+NODES = ['N{}'.format(i) for i in range(30)]
+
+COMPARISONS = {'==': operator.eq, '<': operator.lt, '>=': operator.ge}
+
+
+def create_board(seed, num_pins=90):
+    rng = random.Random(seed)
+    board = Board()
+    pins = board.add_pins([Pin(rng.uniform(0, 100), rng.uniform(0, 100),
+        rng.choice(NODES)) for i in range(num_pins)])
+
+    return board, pins, rng
+
+
+def components(board):
+    """
+        The nodes of the board grouped by searching the connections, as a
+        mapping from each node to the frozenset of its component.
+    """
+
+    neighbours = {node: set() for node in board.quick_union.names}
+    for connection in board.connections:
+        neighbours[connection.pin1.node].add(connection.pin2.node)
+        neighbours[connection.pin2.node].add(connection.pin1.node)
+
+    result = {}
+    for node in neighbours:
+        if node in result:
+            continue
+
+        component = {node}
+        stack = [node]
+        while stack:
+            for other in neighbours[stack.pop()]:
+                if other not in component:
+                    component.add(other)
+                    stack.append(other)
+
+        component = frozenset(component)
+        for member in component:
+            result[member] = component
+
+    return result
+
+
+def assert_consistent(board):
+    expected = components(board)
+
+    for node, component in expected.items():
+        assert set(board.net_members(node)) == component
+        assert board.net_size(node) == len(component)
+
+        for other in component:
+            assert board.net_id(other) == board.net_id(node)
+
+
+def wire_ends(board):
+    indices = {id(pin): i for i, pin in enumerate(board.pin_table)}
+
+    return sorted((indices[id(c.pin1)], indices[id(c.pin2)])
+        for c in board.connections)
+
+
+def random_edit(board, pins, rng):
+    if rng.random() < 0.7:
+        board.add_connection(rng.choice(pins), rng.choice(pins))
+    else:
+        board.remove_connections(rng.choice(pins))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_add_and_remove(seed):
+    board, pins, rng = create_board(seed)
+
+    for i in range(300):
+        random_edit(board, pins, rng)
+        assert_consistent(board)
+
+
+def test_remove_returns_connections():
+    board, pins, rng = create_board(0)
+    a, b, c = pins[:3]
+
+    first = board.add_connection(a, b)
+    second = board.add_connection(b, c)
+    board.add_connection(a, c)
+
+    removed = board.remove_connections(b)
+
+    assert {connection.id for connection in removed} == {first.id, second.id}
+    assert board.remove_connections(b) == []
+    assert_consistent(board)
+
+
+def test_batch_notifies_once():
+    board, pins, rng = create_board(1)
+    changes = []
+    board.add_listener(lambda board, change: changes.append(change))
+
+    with board.batch():
+        first = board.add_connection(pins[0], pins[1])
+        with board.batch():
+            board.add_connection(pins[2], pins[3])
+        board.remove_connections(pins[0])
+
+        assert not changes
+
+    assert len(changes) == 1
+    assert first.id not in changes[0].added
+    assert first.id not in changes[0].removed
+    assert len(changes[0].added) == 1
+    assert_consistent(board)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_undo_redo(seed):
+    board, pins, rng = create_board(seed)
+    journal = Journal(board)
+
+    for i in range(400):
+        r = rng.random()
+        if r < 0.5:
+            random_edit(board, pins, rng)
+        elif r < 0.6:
+            with board.batch():
+                for j in range(3):
+                    random_edit(board, pins, rng)
+        elif r < 0.8:
+            journal.undo()
+        else:
+            journal.redo()
+
+        assert_consistent(board)
+
+
+def test_undo_all_and_redo_all():
+    board, pins, rng = create_board(2)
+    journal = Journal(board)
+
+    # Removing the wires of a pin without any is not a step in the journal
+    states = [set(board.connections.connections)]
+    board.add_listener(lambda board, change: states.append(
+        set(board.connections.connections)))
+
+    for i in range(100):
+        random_edit(board, pins, rng)
+
+    board.remove_listener(board.listeners[-1])
+
+    for state in reversed(states[:-1]):
+        journal.undo()
+        assert set(board.connections.connections) == state
+        assert_consistent(board)
+
+    assert journal.undo() is None
+
+    for state in states[1:]:
+        journal.redo()
+        assert set(board.connections.connections) == state
+        assert_consistent(board)
+
+    assert journal.redo() is None
+
+
+def test_journal_limits():
+    board, pins, rng = create_board(4)
+    journal = Journal(board, depth=20, max_writes=100)
+
+    for i in range(200):
+        random_edit(board, pins, rng)
+
+        assert len(journal.undo_stack) <= 20
+        assert journal.writes <= 100 or len(journal.undo_stack) == 1
+
+    while journal.undo():
+        assert_consistent(board)
+
+    while journal.redo():
+        assert_consistent(board)
+
+
+def test_new_edit_drops_redo():
+    board, pins, rng = create_board(3)
+    journal = Journal(board)
+
+    board.add_connection(pins[0], pins[1])
+    journal.undo()
+    assert journal.can_redo()
+
+    board.add_connection(pins[2], pins[3])
+    assert not journal.can_redo()
+
+
+def test_no_undo_within_batch():
+    board = Board()
+    a, c, d = board.add_pins([Pin(0, 0, 'A'), Pin(1, 0, 'C'), Pin(2, 0, 'D')])
+    journal = Journal(board)
+
+    board.add_connection(a, c)
+    board.add_connection(a, d)
+    journal.undo()
+
+    with board.batch():
+        board.add_connection(c, d)
+
+        with pytest.raises(ValueError):
+            journal.undo()
+        with pytest.raises(ValueError):
+            journal.redo()
+
+    assert board.nodes_connected('A', 'D')
+    assert len(board.connections) == 2
+    assert_consistent(board)
+
+    # The refused steps are kept, and undo works again after the batch
+    assert len(journal.undo_stack) == 2
+    journal.undo()
+    assert_consistent(board)
+    journal.undo()
+    assert not board.connections
+    assert_consistent(board)
+
+
+def test_snapshot_same_board(tmp_path):
+    board, pins, rng = create_board(4)
+    journal = Journal(board)
+    for i in range(100):
+        random_edit(board, pins, rng)
+
+    path = str(tmp_path / 'board.snapshot')
+    board.save_snapshot(path)
+    expected = components(board)
+    ends = wire_ends(board)
+
+    for i in range(50):
+        random_edit(board, pins, rng)
+
+    board.restore_snapshot(path)
+
+    assert components(board) == expected
+    assert wire_ends(board) == ends
+    assert_consistent(board)
+
+    # Restoring replaces the union find arrays, so it can't be undone
+    assert not journal.can_undo()
+
+    for i in range(100):
+        random_edit(board, pins, rng)
+        assert_consistent(board)
+
+
+def test_snapshot_fresh_board(tmp_path):
+    board, pins, rng = create_board(5)
+    for i in range(100):
+        random_edit(board, pins, rng)
+
+    path = str(tmp_path / 'board.snapshot')
+    board.save_snapshot(path)
+
+    restored = Board()
+    restored_pins = restored.restore_snapshot(path)
+
+    assert [(pin.x, pin.y, pin.node) for pin in restored_pins] == [
+        (pin.x, pin.y, pin.node) for pin in pins]
+    assert components(restored) == components(board)
+    assert_consistent(restored)
+    assert restored.nearest_pin((50, 50)) == board.nearest_pin((50, 50))
+
+
+def test_snapshot_different_nodes(tmp_path):
+    board, pins, rng = create_board(6)
+    for i in range(100):
+        random_edit(board, pins, rng)
+
+    path = str(tmp_path / 'board.snapshot')
+    board.save_snapshot(path)
+
+    # Node ids of this board differ from the saved ones, so they have to be
+    # mapped
+    other = Board()
+    other.add_pins([Pin(1, 1, 'X'), Pin(2, 2, NODES[-1])])
+    other.restore_snapshot(path)
+
+    expected = components(board)
+    restored = components(other)
+
+    assert restored['X'] == {'X'}
+    for node in board.quick_union.names:
+        assert restored[node] == expected[node]
+
+    assert_consistent(other)
+
+
+def test_snapshot_rejects_other_files():
+    with pytest.raises(ValueError):
+        Snapshot(b'\0' * 64)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_rules(tmp_path, seed):
+    board, pins, rng = create_board(seed)
+    journal = Journal(board)
+
+    expressions = ['N0~N1', 'N2!~N3', 'N4~N4', 'UNUSED~N8']
+    for node in NODES[5:20]:
+        expressions.append('size({})>={}'.format(node, rng.randrange(2, 8)))
+        expressions.append('size({})==1'.format(node))
+        expressions.append('size({})<{}'.format(node, rng.randrange(2, 8)))
+    rules = RuleSet(board.quick_union, expressions)
+    board.add_listener(lambda board, change: rules.update(change.roots))
+
+    def expected(expression):
+        comps = components(board)
+
+        match = re.match(r'^size\((\w+)\)(\W+)(\d+)$', expression)
+        if match:
+            size = len(comps[match.group(1)])
+            return COMPARISONS[match.group(2)](size, int(match.group(3)))
+
+        a, connected, b = re.match(r'^(\w+)(!?~)(\w+)$', expression).groups()
+        return (comps[a] == comps[b]) == (connected == '~')
+
+    path = str(tmp_path / 'board.snapshot')
+    board.save_snapshot(path)
+
+    for i in range(300):
+        r = rng.random()
+        if r < 0.6:
+            random_edit(board, pins, rng)
+        elif r < 0.75:
+            journal.undo()
+        elif r < 0.9:
+            journal.redo()
+        elif r < 0.95:
+            board.save_snapshot(path)
+        else:
+            board.restore_snapshot(path)
+
+        for expression in expressions:
+            assert rules[expression] == expected(expression), expression
+
+
+def squared_distances(pins, point):
+    return [(pin.x - point[0])**2 + (pin.y - point[1])**2 for pin in pins]
+
+
+@pytest.mark.parametrize('batch_elements', [1, 90 * 7, 1 << 22])
+def test_batch_queries(monkeypatch, batch_elements):
+    pytest.importorskip('numpy')
+
+    # Small batches split the points in chunks of 1 and of 7 points, the
+    # default fits all of them in a single chunk
+    monkeypatch.setattr(pintable, 'BATCH_ELEMENTS', batch_elements)
+
+    board, pins, rng = create_board(9)
+    points = [(rng.uniform(-10, 110), rng.uniform(-10, 110))
+        for i in range(50)]
+    points += [(pin.x, pin.y) for pin in pins[:5]]
+
+    nearest, distances = board.nearest_pins(points)
+    within, within_distances = board.pins_within(points, 4)
+
+    assert len(nearest) == len(within) == len(points)
+
+    for i, point in enumerate(points):
+        expected = min(squared_distances(pins, point))
+
+        assert distances[i] == pytest.approx(expected)
+        assert squared_distances([nearest[i]], point)[0] == pytest.approx(
+            expected)
+
+        if expected > 16:
+            assert within[i] is None
+        else:
+            assert within[i] is nearest[i]
+            assert within_distances[i] == pytest.approx(expected)
+
+    # Both the pins within the radius and those beyond it were queried
+    assert any(pin is None for pin in within)
+    assert any(pin is not None for pin in within)
+
+
+def test_batch_queries_without_pins():
+    numpy = pytest.importorskip('numpy')
+
+    board = Board()
+    nearest, distances = board.nearest_pins([(1, 2), (3, 4)])
+
+    assert nearest == [None, None]
+    assert numpy.isinf(distances).all()
+
+    within, distances = board.pins_within([(1, 2)], 5)
+    assert within == [None]
+
+    nearest, distances = board.nearest_pins([])
+    assert nearest == []
+    assert len(distances) == 0
+
+
+def test_invalid_rule():
+    board, pins, rng = create_board(8)
+
+    with pytest.raises(ValueError):
+        RuleSet(board.quick_union, ['N0 ~~ N1'])
@@ -0,0 +1,115 @@
+"""
+    Tests for importing pin layouts from an SVG and caching them in a
+    sidecar.
+"""
+
+import os
+
+import pytest
+
+from lockgame.board import Board, PinLayout, load_pin_layout
+from lockgame.board import pinlayout
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     width="200" height="100">
+  <g inkscape:label="Board" transform="translate(1000,1000)">
+    <rect inkscape:label="OUTSIDE" x="0" y="0" width="2" height="2"/>
+  </g>
+  <g inkscape:label="Pins" transform="translate(10,20)">
+    <g transform="scale(2)">
+      <rect inkscape:label="A" x="1" y="2" width="4" height="6"/>
+    </g>
+    <circle inkscape:label="B" cx="{b}" cy="5" r="1" transform="rotate(90)"/>
+    <ellipse inkscape:label="C" cx="-3" cy="4" rx="1" ry="2"
+        transform="matrix(1,0,0,1,100,0)"/>
+    <circle cx="50" cy="50" r="1"/>
+    <path inkscape:label="D" d="M 0,0 L 1,1"/>
+  </g>
+  <circle inkscape:label="AFTER" cx="7" cy="7" r="1"/>
+</svg>
+"""
+
+EXPECTED = [(16.0, 30.0, 'A'), (5.0, 25.0, 'B'), (107.0, 24.0, 'C')]
+
+
+def write_svg(path, b=5):
+    path.write_text(SVG.format(b=b))
+
+    return str(path)
+
+
+def pin_tuples(pins):
+    return [(pin.x, pin.y, pin.node) for pin in pins]
+
+
+def assert_pins(pins, expected):
+    pins = pin_tuples(pins)
+
+    assert [node for x, y, node in pins] == [node for x, y, node in expected]
+    for (x, y, node), (expected_x, expected_y, _) in zip(pins, expected):
+        assert x == pytest.approx(expected_x)
+        assert y == pytest.approx(expected_y)
+
+
+def test_import_pins(tmp_path):
+    svg_file = write_svg(tmp_path / 'board.svg')
+
+    assert_pins(pinlayout.import_pins(svg_file), EXPECTED)
+
+
+def test_sidecar_round_trip(tmp_path, monkeypatch):
+    svg_file = write_svg(tmp_path / 'board.svg')
+    cache_dir = str(tmp_path / 'cache')
+
+    layout = load_pin_layout(svg_file, cache_dir)
+
+    assert_pins(layout, EXPECTED)
+    assert os.path.exists(os.path.join(cache_dir, 'board.svg.pins'))
+    assert not os.path.exists(svg_file + '.pins')
+
+    # The second load maps the sidecar, without parsing the SVG
+    def fail(svg_file):
+        raise AssertionError("SVG imported again")
+
+    monkeypatch.setattr(pinlayout, 'import_pins', fail)
+    cached = load_pin_layout(svg_file, cache_dir)
+
+    assert isinstance(cached.buffer, pinlayout.mmap.mmap)
+    assert pin_tuples(cached) == pin_tuples(layout)
+
+    board = Board()
+    assert pin_tuples(board.add_pins(cached)) == pin_tuples(layout)
+
+
+def test_reimport_when_svg_changes(tmp_path):
+    svg_file = write_svg(tmp_path / 'board.svg')
+    load_pin_layout(svg_file)
+
+    # Mapped from the sidecar written by the first load
+    layout = load_pin_layout(svg_file)
+    mtime = os.stat(svg_file).st_mtime_ns
+
+    write_svg(tmp_path / 'board.svg', b=8)
+    os.utime(svg_file, ns=(mtime + 10**9, mtime + 10**9))
+
+    changed = load_pin_layout(svg_file)
+
+    assert changed.svg_mtime == mtime + 10**9
+    assert_pins(changed, [EXPECTED[0], (5.0, 28.0, 'B'), EXPECTED[2]])
+
+    # The old layout keeps its own mapping
+    assert_pins(layout, EXPECTED)
+
+
+def test_no_pins(tmp_path):
+    svg_file = tmp_path / 'empty.svg'
+    svg_file.write_text('<svg xmlns="http://www.w3.org/2000/svg"/>')
+
+    assert load_pin_layout(str(svg_file)) is None
+
+
+def test_reject_other_files():
+    with pytest.raises(ValueError):
+        PinLayout(b'\0' * 64)
@@ -0,0 +1,193 @@
+"""
+    Tests for the vector types: the fast and generic paths of the Vec2d
+    operators, FrozenVec2d and Vec2dArray.
+"""
+
+import operator
+from fractions import Fraction
+
+import pytest
+
+from lockgame.vector import Vec2d, FrozenVec2d, Vec2dArray
+
+
+class SubVec2d(Vec2d):
+    """
+        Takes the isinstance path of the operators instead of the exact type
+        fast path.
+    """
+
+    __slots__ = ()
+
+
+# Right hand operands for each path of the binary operators: the Vec2d and
+# scalar fast paths, and the generic paths for subclasses, sequences and
+# other numbers
+OPERANDS = [
+    (Vec2d(3, 4), (3, 4)),
+    (2, (2, 2)),
+    (0.5, (0.5, 0.5)),
+    (SubVec2d(3, 4), (3, 4)),
+    ((3, 4), (3, 4)),
+    ([3, 4], (3, 4)),
+    (FrozenVec2d(3, 4), (3, 4)),
+    (Fraction(1, 2), (Fraction(1, 2), Fraction(1, 2))),
+]
+
+OPERATORS = [operator.add, operator.sub, operator.mul, operator.truediv]
+
+INPLACE_OPERATORS = [
+    (operator.iadd, operator.add),
+    (operator.isub, operator.sub),
+    (operator.imul, operator.mul),
+    (operator.itruediv, operator.truediv),
+]
+
+
+def assert_vector(vector, x, y):
+    assert type(vector) is Vec2d
+    assert (vector.x, vector.y) == (x, y)
+
+
+def test_construct():
+    assert_vector(Vec2d(1, 2), 1, 2)
+    assert_vector(Vec2d((1, 2)), 1, 2)
+    assert_vector(Vec2d(Vec2d(1, 2)), 1, 2)
+
+    # A zero y is a coordinate, not a missing one
+    assert_vector(Vec2d(5, 0), 5, 0)
+    assert_vector(Vec2d(0, 0), 0, 0)
+    assert_vector(Vec2d(5, 0.0), 5, 0.0)
+
+
+@pytest.mark.parametrize('other, components', OPERANDS)
+@pytest.mark.parametrize('op', OPERATORS)
+def test_operators(op, other, components):
+    result = op(Vec2d(6, 8), other)
+
+    assert_vector(result, op(6, components[0]), op(8, components[1]))
+
+
+@pytest.mark.parametrize('other, components', OPERANDS)
+def test_reflected_operators(other, components):
+    # Frozen vectors keep their own type, see test_frozen_operators
+    if isinstance(other, (Vec2d, FrozenVec2d)):
+        return
+
+    vector = Vec2d(6, 8)
+
+    assert_vector(other + vector, components[0] + 6, components[1] + 8)
+    assert_vector(other - vector, components[0] - 6, components[1] - 8)
+    assert_vector(other * vector, components[0] * 6, components[1] * 8)
+
+
+@pytest.mark.parametrize('other, components', OPERANDS)
+@pytest.mark.parametrize('op, scalar_op', INPLACE_OPERATORS)
+def test_inplace_operators(op, scalar_op, other, components):
+    vector = Vec2d(6, 8)
+
+    assert op(vector, other) is vector
+    assert_vector(vector, scalar_op(6, components[0]),
+        scalar_op(8, components[1]))
+
+
+def test_division():
+    vector = original = Vec2d(7, 5)
+    vector /= 2
+
+    # True division, like the / operator
+    assert vector is original
+    assert_vector(vector, 3.5, 2.5)
+    assert_vector(Vec2d(7, 5) / 2, 3.5, 2.5)
+    assert_vector(Vec2d(7, 5) / (2, 4), 3.5, 1.25)
+
+    vector = Vec2d(7, 5)
+    vector //= 2
+    assert_vector(vector, 3, 2)
+    assert_vector(Vec2d(7, 5) // 2, 3, 2)
+
+    assert_vector(10 / Vec2d(4, 5), 2.5, 2.0)
+
+
+def test_frozen_hash_and_equality():
+    frozen = FrozenVec2d(1.5, 2)
+
+    assert frozen == Vec2d(1.5, 2)
+    assert Vec2d(1.5, 2) == frozen
+    assert frozen != Vec2d(2, 1.5)
+    assert frozen == FrozenVec2d((1.5, 2))
+    assert Vec2d(1.5, 2).frozen() == frozen
+
+    assert hash(frozen) == hash(FrozenVec2d(1.5, 2))
+    assert {frozen: 'pin'}[Vec2d(1.5, 2).frozen()] == 'pin'
+    assert len({frozen, FrozenVec2d(1.5, 2), FrozenVec2d(2, 1.5)}) == 2
+
+    thawed = frozen.thawed()
+    assert_vector(thawed, 1.5, 2)
+
+    with pytest.raises(AttributeError):
+        frozen.x = 3
+
+
+def test_frozen_operators():
+    frozen = FrozenVec2d(6, 8)
+
+    # Arithmetic instead of the tuple concatenation and repetition
+    for result, expected in [
+            (frozen + (1, 2), (7, 10)),
+            ((1, 2) + frozen, (7, 10)),
+            (frozen + Vec2d(1, 2), (7, 10)),
+            (frozen + 1, (7, 9)),
+            (1 + frozen, (7, 9)),
+            (frozen - (1, 2), (5, 6)),
+            ((1, 2) - frozen, (-5, -6)),
+            (10 - frozen, (4, 2)),
+            (frozen * 2, (12, 16)),
+            (2 * frozen, (12, 16)),
+            (frozen * (2, 3), (12, 24)),
+            (frozen / 2, (3.0, 4.0)),
+            (-frozen, (-6, -8)),
+            (frozen.perpendicular(), (-8, 6)),
+            (frozen.normalized(), (0.6, 0.8))]:
+        assert type(result) is FrozenVec2d
+        assert tuple(result) == expected
+
+    assert frozen.length == 10
+    assert frozen.dot((1, 1)) == 14
+    assert FrozenVec2d(0, 0).normalized() == (0, 0)
+    assert not FrozenVec2d(0, 0)
+
+
+def test_array_operators():
+    numpy = pytest.importorskip('numpy')
+
+    pairs = [(3, 4), (-1, 2), (0, 0)]
+    array = Vec2dArray(pairs)
+
+    for other in [2, (1, 2), Vec2d(1, 2),
+            Vec2dArray([(1, 1), (2, 2), (3, 3)])]:
+        for op in OPERATORS:
+            result = op(array, other)
+            expected = [op(Vec2d(pair), other[i]
+                if isinstance(other, Vec2dArray) else other)
+                for i, pair in enumerate(pairs)]
+
+            assert isinstance(result, Vec2dArray)
+            assert list(result) == expected
+
+    assert list(array.get_length()) == [5, numpy.hypot(-1, 2), 0]
+    assert list(array.dot((1, 1))) == [7, 1, 0]
+    assert list(Vec2dArray([3, 0], [4, 0])) == [Vec2d(3, 4), Vec2d(0, 0)]
+
+
+def test_array_normalized_zero_length():
+    numpy = pytest.importorskip('numpy')
+
+    array = Vec2dArray([(3, 4), (0, 0), (0, -2)])
+
+    # Zero length vectors stay zero without dividing by zero
+    with numpy.errstate(all='raise'):
+        normalized = array.normalized()
+
+    assert list(normalized) == [Vec2d(0.6, 0.8), Vec2d(0, 0), Vec2d(0, -1)]
+    assert list(Vec2dArray([]).normalized()) == []